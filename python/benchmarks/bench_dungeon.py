@@ -0,0 +1,70 @@
+"""
+地牢基准：旧的二维字符列表 + 全量洗牌 对比 扁平 bytearray 地块编码 + 去重批量生成。
+报告生成耗时、峰值内存与整图渲染耗时。
+
+用法 (在 python/ 目录下): python -m benchmarks.bench_dungeon [边长...]
+"""
+import sys
+import time
+import tracemalloc
+
+from engine.state import GameState
+from engine.dungeon import DungeonEngine
+from utils.rng import SeededRNG
+
+def legacy_generate(rng, width, height, level_num=1):
+    """旧实现：list[list[str]]，walked_path 含重复步，洗牌整个路径后再放置符号"""
+    grid = [["#" for _ in range(width)] for _ in range(height)]
+    x, y = width // 2, height // 2
+    start = (x, y)
+    steps = (width * height) // 2 + (level_num * 2)
+    walked_path = []
+    directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+    for r in rng.random_batch(steps):
+        grid[y][x] = " "
+        walked_path.append((x, y))
+        dx, dy = directions[int(r * 4)]
+        nx, ny = x + dx, y + dy
+        if 1 <= nx < width - 1 and 1 <= ny < height - 1:
+            x, y = nx, ny
+    spawn_pool = [p for p in walked_path if p != start]
+    rng.shuffle(spawn_pool)
+    for sym in "E!!??***%%%":
+        if spawn_pool:
+            sx, sy = spawn_pool.pop()
+            grid[sy][sx] = sym
+    return grid
+
+def measure(fn):
+    """返回 (耗时, 峰值内存)；耗时单独测量，避免 tracemalloc 的开销"""
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    del result
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def main(argv):
+    sizes = [int(a) for a in argv[1:]] or [100, 1000]
+    for size in sizes:
+        t_old, m_old, grid = measure(lambda: legacy_generate(SeededRNG(1).stream("dungeon"), size, size))
+        start = time.perf_counter()
+        "\n".join("".join(row) for row in grid)
+        r_old = time.perf_counter() - start
+        del grid
+
+        dungeon = DungeonEngine(GameState(), SeededRNG(1), size, size)
+        t_new, m_new, _ = measure(lambda: dungeon.generate_level(1))
+        start = time.perf_counter()
+        dungeon.render()
+        r_new = time.perf_counter() - start
+
+        print(f"{size}x{size}")
+        print(f"  legacy : gen {t_old * 1000:8.1f} ms  peak {m_old / 1e6:7.1f} MB  render {r_old * 1000:6.1f} ms")
+        print(f"  bytes  : gen {t_new * 1000:8.1f} ms  peak {m_new / 1e6:7.1f} MB  render {r_new * 1000:6.1f} ms  grid {len(dungeon.grid) / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main(sys.argv)
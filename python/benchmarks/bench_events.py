@@ -0,0 +1,60 @@
+"""
+随机事件基准：每次检查都重新过滤全部事件并线性加权抽取，对比增量维护的满足集合 + 别名表。
+
+用法 (在 python/ 目录下): python -m benchmarks.bench_events [事件数] [检查次数]
+"""
+import sys
+import time
+
+from engine.state import GameState
+from engine.events import RandomEvents
+from utils.rng import SeededRNG
+
+def make_events(n_events, n_resources=20, seed=1):
+    rng = SeededRNG(seed)
+    events = []
+    for i in range(n_events):
+        requirements = {f"res_{rng.randint(0, n_resources - 1)}": rng.randint(0, 1000) for _ in range(rng.randint(0, 2))}
+        events.append({"id": f"ev_{i}", "weight": rng.randint(1, 10), "requirements": requirements, "effect": {}})
+    return events
+
+def linear_check(events, state, rng):
+    available = []
+    for event in events:
+        met = True
+        for res, amount in event.get("requirements", {}).items():
+            if state.resources.get(res, 0) < amount:
+                met = False
+                break
+        if met:
+            available.append((event, event.get("weight", 1)))
+    return rng.weighted_choice(available) if available else None
+
+def run(check, checks, n_resources=20):
+    """资源缓慢增长 (类似放置游戏的常态)，每次检查前一种资源变化"""
+    state = GameState()
+    rng = SeededRNG(2)
+    start = time.perf_counter()
+    for i in range(checks):
+        res = f"res_{i % n_resources}"
+        state.resources[res] = state.resources.get(res, 0) + 1.5
+        check(state, rng)
+    return (time.perf_counter() - start) / checks
+
+def main(argv):
+    n_events = int(argv[1]) if len(argv) > 1 else 5000
+    checks = int(argv[2]) if len(argv) > 2 else 2000
+    events = make_events(n_events)
+
+    table = RandomEvents()
+    table.compile(events)
+    t_linear = run(lambda state, rng: linear_check(events, state, rng), checks)
+    t_alias = run(table.sample, checks)
+
+    print(f"events={n_events} checks={checks}")
+    print(f"linear : {t_linear * 1e6:10.1f} us/check")
+    print(f"alias  : {t_alias * 1e6:10.1f} us/check")
+    print(f"speedup: {t_linear / t_alias:10.1f}x")
+
+if __name__ == "__main__":
+    main(sys.argv)
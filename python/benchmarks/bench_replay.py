@@ -0,0 +1,83 @@
+"""
+录像回放基准：用脚本化的玩家录制一段会话 (默认 3 小时，每秒一个 tick)，
+导出为 CYREPLAY- 字符串后无头回放，检查最终状态哈希一致并报告回放耗时。
+
+用法 (在 python/ 目录下): python -m benchmarks.bench_replay [小时数] [种子] [预算秒数]
+"""
+import json
+import random
+import sys
+import time
+
+from engine.state import GameState
+from engine.session import InputRecorder, dumps_replay, loads_replay
+from engine.replay import build_session, replay
+
+DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+def new_game_start(seed):
+    """与 main.start_game 开新档时相同的起始存档：空状态 + 一个初始守护程序"""
+    state = GameState()
+    state.seed = seed
+    state.language = "en"
+    start = state.to_dict()
+    daemon_mgr = build_session(seed, start).daemon_mgr
+    start["daemons"] = [daemon_mgr.create_daemon("vanguard", level=1)]
+    return json.loads(json.dumps(start))
+
+def play(session, rng):
+    """每个 tick 之前的玩家输入：随机操作 (玩家的选择与游戏内随机流无关)"""
+    state = session.state
+    if session.combat.is_active:
+        session.combat_action("attack" if session.combat.player_bw >= 20 else "reset")
+        return
+    roll = rng.random()
+    if roll < 0.3:
+        session.move(*rng.choice(DIRECTIONS))
+    elif roll < 0.35:
+        affordable = [b_id for b_id in session.manager.building_defs if session.manager.max_affordable(b_id) > 0]
+        if affordable:
+            session.build(rng.choice(affordable), 1)
+    elif roll < 0.37:
+        node = session.story.get_current_node()
+        if node and node.get("actions"):
+            session.story_choice(state.current_story_node, rng.choice(list(node["actions"])))
+    elif roll < 0.38:
+        for quest in state.active_quests:
+            if quest["completed"]:
+                session.claim_quest(quest["id"])
+                break
+    elif roll < 0.385 and state.daemons:
+        session.switch_daemon(rng.randrange(len(state.daemons)))
+
+def record(hours, seed):
+    start = new_game_start(seed)
+    session = build_session(seed, start)
+    # 起始存档取地牢生成之前的状态，与 main.start_game 中录制开始的时机一致
+    session.recorder = InputRecorder(session.state, start)
+    rng = random.Random(seed)
+    for _ in range(int(hours * 3600)):
+        play(session, rng)
+        session.tick(1000 + rng.randint(-5, 5)) # 浏览器中的 tick 间隔有少许抖动
+    return session.recorder.to_data(session.state)
+
+def main(argv):
+    hours = float(argv[1]) if len(argv) > 1 else 3
+    seed = int(argv[2]) if len(argv) > 2 else 1
+    budget = float(argv[3]) if len(argv) > 3 else 2.0
+
+    data = record(hours, seed)
+    text = dumps_replay(data)
+    loaded = loads_replay(text)
+
+    start = time.perf_counter()
+    session, digest = replay(loaded)
+    wall = time.perf_counter() - start
+
+    print(f"recorded {hours}h: {len(data['ticks'])} ticks, {len(data['commands'])} commands, replay string {len(text):,} chars")
+    print(f"replay : {wall:.3f}s ({hours * 3600 / wall:,.0f}x real time, budget {budget}s)")
+    print(f"hash   : {digest} (recorded {data['hash']}) {'OK' if digest == data['hash'] else 'MISMATCH'}")
+    return 0 if digest == data["hash"] and wall <= budget else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
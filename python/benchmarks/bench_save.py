@@ -0,0 +1,73 @@
+"""
+存档字符串基准：旧的 CYBER- (Base64 JSON) 对比紧凑的 CYBER2- 格式，
+在含 10 / 1,000 / 100,000 个守护程序的合成存档上比较字符串长度、编码与解码耗时。
+
+用法 (在 python/ 目录下): python -m benchmarks.bench_save [守护程序数 ...]
+"""
+import base64
+import json
+import os
+import sys
+import time
+
+from engine.state import GameState
+from engine.daemon import DaemonManager
+from utils.bundle import load_content
+from utils.rng import SeededRNG
+from utils.savecodec import LEGACY_PREFIX, dumps_save_string, loads_save_string
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data"))
+
+def make_save(n_daemons, seed=1):
+    """生成一个合成存档：n_daemons 个随机等级、已学部分技能的守护程序，外加满容量的剧情日志"""
+    _, content = load_content("en", os.path.join(DATA_DIR, "bundle.bin"))
+    rng = SeededRNG(seed)
+    state = GameState()
+    daemon_mgr = DaemonManager(state)
+    daemon_mgr.load_definitions(content["daemons"])
+    daemon_ids = list(daemon_mgr.definitions)
+
+    daemons = []
+    for _ in range(n_daemons):
+        daemon = daemon_mgr.create_daemon(rng.choice(daemon_ids), level=rng.randint(1, 60))
+        daemon["xp"] = rng.randint(0, daemon["xp_to_next"] - 1)
+        skills = daemon_mgr.skill_tables[daemon["id"]].skills
+        daemon["learned_skills"] = [skill_id for skill_id in skills if rng.random() < 0.5]
+        daemon["equipped_skills"] = [skill_id for skill_id in daemon["learned_skills"]
+                                     if skills[skill_id]["type"] == "active"][:4]
+        daemons.append(daemon)
+    state.daemons = daemons
+
+    for res_id in content["resources"]:
+        state.resources[res_id] = rng.random() * 1e6
+    for category in content["buildings"].values():
+        for b_id in category:
+            state.buildings[b_id] = rng.randint(0, 50)
+    for i in range(500):
+        state.story_log.append("story", f"> node_{i % 40}: {rng.randint(0, 10 ** 6)}")
+    return state.to_dict()
+
+def legacy_dumps(data):
+    """旧的导出方式：缩进 JSON + Base64"""
+    return LEGACY_PREFIX + base64.b64encode(json.dumps(data, indent=4).encode("utf-8")).decode("utf-8")
+
+def timed(fn, arg, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn(arg)
+    return result, (time.perf_counter() - start) / runs
+
+def main(argv):
+    sizes = [int(n) for n in argv[1:]] or [10, 1000, 100000]
+    print(f"{'daemons':>8} {'format':>7} {'chars':>12} {'encode ms':>10} {'decode ms':>10}")
+    for n in sizes:
+        data = make_save(n)
+        runs = max(1, 2000 // max(n, 1))
+        for name, dumps in (("CYBER", legacy_dumps), ("CYBER2", dumps_save_string)):
+            text, t_encode = timed(dumps, data, runs)
+            loaded, t_decode = timed(loads_save_string, text, runs)
+            assert loaded == json.loads(json.dumps(data)), f"{name} round-trip mismatch"
+            print(f"{n:>8} {name:>7} {len(text):>12,} {t_encode * 1e3:>10.2f} {t_decode * 1e3:>10.2f}")
+
+if __name__ == "__main__":
+    main(sys.argv)
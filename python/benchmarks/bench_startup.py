@@ -0,0 +1,101 @@
+"""
+启动基准：从读取定义到首帧地牢可渲染 (time-to-interactive) 的耗时，
+对比逐个 JSON 文件与预编译内容包两种加载方式；并对比切换语言时整体重载与原地切换字符串层。
+
+用法 (在 python/ 目录下): python -m benchmarks.bench_startup [重复次数] [语言]
+运行前先用 python -m utils.bundle 生成 data/bundle.bin
+"""
+import os
+import sys
+import time
+
+from engine.state import GameState
+from engine.manager import GameManager
+from engine.story import StoryManager
+from engine.dungeon import DungeonEngine
+from engine.daemon import DaemonManager
+from engine.quest import QuestManager
+from utils.rng import SeededRNG
+from utils.i18n import I18nManager
+from utils.bundle import load_content, load_json_content, open_content
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data"))
+BUNDLE_PATH = os.path.join(DATA_DIR, "bundle.bin")
+
+def boot(load):
+    """按 main.start_game 的顺序组装引擎，直到地牢首帧可渲染"""
+    state = GameState()
+    rng = SeededRNG(1)
+    manager = GameManager(state, rng)
+    story = StoryManager(state)
+    manager.set_story_manager(story)
+    i18n = I18nManager(state)
+    dungeon = DungeonEngine(state, rng)
+    daemon_mgr = DaemonManager(state)
+    quest_mgr = QuestManager(state)
+
+    ui_data, content = load()
+    i18n.load_ui_translations(ui_data)
+    manager.load_definitions(content["resources"], content["events"], content["buildings"], content["artifacts"])
+    story.load_nodes(content["story"])
+    daemon_mgr.load_definitions(content["daemons"])
+    quest_mgr.load_definitions(content["quests"])
+
+    state.daemons.append(daemon_mgr.create_daemon("vanguard", level=1))
+    dungeon.generate_level(1)
+    return dungeon.render()
+
+def bench(load, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        boot(load)
+    return (time.perf_counter() - start) / runs
+
+def reload_switch(lang, manager, story):
+    """旧的切换方式：重新读取并装载该语言的全部定义"""
+    _, content = load_json_content(lang, DATA_DIR)
+    manager.load_definitions(content["resources"], content["events"], content["buildings"], content["artifacts"])
+    story.load_nodes(content["story"])
+
+def bench_switch(runs):
+    state = GameState()
+    manager = GameManager(state, SeededRNG(1))
+    story = StoryManager(state)
+    localized = open_content("en", BUNDLE_PATH)
+    content = localized.content
+    manager.load_definitions(content["resources"], content["events"], content["buildings"], content["artifacts"])
+    story.load_nodes(content["story"])
+
+    langs = ["zh", "en"] * (runs // 2)
+    start = time.perf_counter()
+    for lang in langs:
+        reload_switch(lang, manager, story)
+    t_reload = (time.perf_counter() - start) / len(langs)
+
+    start = time.perf_counter()
+    for lang in langs:
+        localized.switch(lang)
+    t_swap = (time.perf_counter() - start) / len(langs)
+    return t_reload, t_swap
+
+def main(argv):
+    runs = int(argv[1]) if len(argv) > 1 else 200
+    lang = argv[2] if len(argv) > 2 else "en"
+    if not os.path.exists(BUNDLE_PATH):
+        print(f"missing {BUNDLE_PATH}; run: python -m utils.bundle")
+        return
+
+    t_json = bench(lambda: load_json_content(lang, DATA_DIR), runs)
+    t_bundle = bench(lambda: load_content(lang, BUNDLE_PATH), runs)
+
+    print(f"lang={lang} runs={runs}")
+    print(f"json files : {t_json * 1e3:8.3f} ms to interactive")
+    print(f"bundle     : {t_bundle * 1e3:8.3f} ms to interactive")
+    print(f"speedup    : {t_json / t_bundle:8.2f}x")
+
+    t_reload, t_swap = bench_switch(runs)
+    print(f"switch reload  : {t_reload * 1e3:8.3f} ms")
+    print(f"switch in-place: {t_swap * 1e3:8.3f} ms")
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,79 @@
+"""
+存储后端基准：对每种后端测量
+    queue - AutoSaver.save 的耗时 (序列化 + 入队，发生在游戏循环中)
+    flush - 批量提交写入的耗时 (在独立协程中)
+    load  - 重新打开后端并读档的耗时
+以及实际保存的字节数。存档为 bench_save 的合成存档 (10 / 1,000 / 100,000 个守护程序)。
+
+无头环境下可测 memory、file 后端，以及用字典代替 localStorage 的字符串 (JSON) 路径；
+浏览器中可在控制台对 LocalStorageBackend / IndexedDBBackend 调用 await measure(...)。
+
+用法 (在 python/ 目录下): python -m benchmarks.bench_storage [守护程序数 ...]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+
+from engine.state import GameState
+from utils.backends import MemoryBackend, LocalStorageBackend
+from utils.storage import AutoSaver, load_saved
+from benchmarks.bench_save import make_save
+
+class DictStorage(dict):
+    """localStorage 的同步字符串接口，用于在无头环境下测量字符串存档路径"""
+
+    def getItem(self, key):
+        return self.get(key)
+
+    def setItem(self, key, value):
+        self[key] = value
+
+    def removeItem(self, key):
+        self.pop(key, None)
+
+async def measure(backend, reopen, data):
+    """reopen() 返回一个指向同一份存储、尚未打开的新后端实例"""
+    state = GameState()
+    state.from_dict(data)
+    await backend.open()
+    saver = AutoSaver(state, backend)
+
+    start = time.perf_counter()
+    size = saver.save(force=True)
+    t_queue = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await backend.flush()
+    t_flush = time.perf_counter() - start
+
+    loaded = GameState()
+    start = time.perf_counter()
+    fresh = await reopen().open()
+    ok = load_saved(loaded, fresh)
+    t_load = time.perf_counter() - start
+    assert ok and loaded.to_dict() == state.to_dict(), f"{backend.name} round-trip mismatch"
+    return size, t_queue, t_flush, t_load
+
+async def run(sizes):
+    print(f"{'daemons':>8} {'backend':>14} {'bytes':>12} {'queue ms':>9} {'flush ms':>9} {'load ms':>9}")
+    for n in sizes:
+        data = make_save(n)
+        memory = MemoryBackend()
+        shared = DictStorage()
+        with tempfile.TemporaryDirectory() as path:
+            cases = [
+                ("memory", memory, lambda: memory),
+                ("file", MemoryBackend(path), lambda: MemoryBackend(path)),
+                ("text (dict)", LocalStorageBackend(shared), lambda: LocalStorageBackend(shared)),
+            ]
+            for label, backend, reopen in cases:
+                size, t_queue, t_flush, t_load = await measure(backend, reopen, data)
+                print(f"{n:>8} {label:>14} {size:>12,} {t_queue * 1e3:>9.2f} {t_flush * 1e3:>9.2f} {t_load * 1e3:>9.2f}")
+
+def main(argv):
+    sizes = [int(n) for n in argv[1:]] or [10, 1000, 100000]
+    asyncio.run(run(sizes))
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,10 +1,13 @@
-import random
+from engine.log import CombatLog
 
 class CombatEngine:
-    def __init__(self, state, daemon_mgr, update_ui_callback):
+    def __init__(self, state, daemon_mgr, update_ui_callback, rng, quest_mgr=None):
         self.state = state
         self.daemon_mgr = daemon_mgr
+        self.quest_mgr = quest_mgr # 胜利时推进战斗类任务
         self.update_ui_callback = update_ui_callback
+        self.rng = rng.stream("combat")          # 敌人意图与命中判定
+        self.capture_rng = rng.stream("capture") # 战斗后的捕获
         
         self.is_active = False
         self.enemy = None
@@ -13,12 +16,13 @@ class CombatEngine:
         self.enemy_hp = 100
         self.enemy_intent = None
         self.turn_count = 0
-        self.log = []
+        self.log = CombatLog()
 
     def start_combat(self, enemy_type, level):
         self.is_active = True
         self.turn_count = 1
-        self.log = [f"--- 遭遇安全程序: {enemy_type} (Lv.{level}) ---"]
+        self.log.clear()
+        self.log.append("system", f"--- 遭遇安全程序: {enemy_type} (Lv.{level}) ---")
         
         # 初始化敌人
         self.enemy = {
@@ -50,7 +54,7 @@ class CombatEngine:
             {"id": "heavy_attack", "name": "强力攻击", "power": 1.5, "chance": 0.6},
             {"id": "scan", "name": "系统扫描", "power": 0, "chance": 1.0}
         ]
-        self.enemy_intent = random.choice(actions)
+        self.enemy_intent = self.rng.choice(actions)
 
     def execute_player_action(self, action_id):
         if not self.is_active: return
@@ -80,26 +84,21 @@ class CombatEngine:
             msg = "> 你执行了 [系统重置]，带宽恢复 50%。"
         
         else:
-            # 处理自定义技能 (从职业定义中获取技能数据)
-            defn = self.daemon_mgr.definitions[active_daemon["id"]]
-            skill = next((s for s in defn["skill_tree"] if s["id"] == action_id), None)
+            # 处理自定义技能 (编译后的技能表，效果由 daemons.json 声明)
+            table = self.daemon_mgr.skill_tables[active_daemon["id"]]
+            skill = table.get(action_id)
             
             if skill:
                 cost = skill.get("bw_cost", 0)
                 if self.player_bw >= cost:
-                    damage = active_daemon["stats"]["intrusion"] * skill.get("power", 1.0)
-                    self.enemy_hp -= damage
                     self.player_bw -= cost
+                    damage = table.cast(action_id, self, active_daemon)
                     msg = f"> 你释放了 [{skill['name']}]，造成 {int(damage)} 点伤害。"
-                    
-                    # 特殊效果处理
-                    if action_id == "kernel_panic":
-                        self.player_bw = 0
                 else:
                     msg = f"> 带宽不足以释放 [{skill['name']}]！"
                     return # 不消耗回合
 
-        self.log.append(msg)
+        self.log.append("player", msg)
         
         # 2. 检查敌人是否死亡
         if self.enemy_hp <= 0:
@@ -129,7 +128,7 @@ class CombatEngine:
                 damage /= 2
             
             # 命中判定
-            if random.random() < intent["chance"]:
+            if self.rng.random() < intent["chance"]:
                 self.player_hp -= damage
                 msg += f" 命中！造成 {int(damage)} 点伤害。"
             else:
@@ -137,32 +136,27 @@ class CombatEngine:
         elif intent["id"] == "scan":
             msg += " 你的系统漏洞被标记，敌人下次攻击更准。"
             
-        self.log.append(msg)
+        self.log.append("enemy", msg)
 
     def end_combat(self, victory):
         self.is_active = False
         if victory:
-            self.log.append("--- 战斗胜利！系统威胁已清除 ---")
+            self.log.append("system", "--- 战斗胜利！系统威胁已清除 ---")
             # 结算奖励
             xp_gain = 20 + self.enemy["level"] * 5
             leveled_up = self.daemon_mgr.add_xp(self.state.active_daemon_index, xp_gain)
             
-            # 尝试更新任务进度
-            try:
-                import sys
-                main_module = sys.modules['__main__']
-                if hasattr(main_module, 'quest_mgr'):
-                    main_module.quest_mgr.update_progress("combat")
-            except:
-                pass
+            # 更新任务进度
+            if self.quest_mgr is not None:
+                self.quest_mgr.update_progress("combat")
             
             # 捕获逻辑
-            if random.random() < 0.15:
-                new_id = random.choice(list(self.daemon_mgr.definitions.keys()))
+            if self.capture_rng.random() < 0.15:
+                new_id = self.capture_rng.sample(self.daemon_mgr.capture_sampler)
                 new_daemon = self.daemon_mgr.create_daemon(new_id, level=self.enemy["level"])
                 self.state.daemons.append(new_daemon)
         else:
-            self.log.append("--- 战斗失败！系统崩溃，强制断开 ---")
+            self.log.append("system", "--- 战斗失败！系统崩溃，强制断开 ---")
             self.state.resources["energy"] = max(0, self.state.resources["energy"] - 30)
         
         # 触发一次 UI 更新以显示最终日志，然后在 main.py 的逻辑中会自动因为 is_active=False 切换回地图
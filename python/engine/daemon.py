@@ -1,50 +1,39 @@
 import math
+from utils.bundle import parse_data
+from engine.skills import compile_skill_tables
+from engine.roster import new_daemon, xp_requirement, daemon_stats
+from utils.rng import WeightedSampler
 
 class DaemonManager:
     def __init__(self, state):
         self.state = state
         self.definitions = {}
+        self.skill_tables = {} # { daemon_id: SkillTable }，载入时编译
+        self.capture_sampler = WeightedSampler() # 战斗胜利后捕获的职业 (权重取 capture_weight，默认均等)
 
     def load_definitions(self, daemons_json):
-        import json
-        self.definitions = json.loads(daemons_json)
+        self.definitions = parse_data(daemons_json)
+        self.skill_tables = compile_skill_tables(self.definitions)
+        self.capture_sampler.rebuild([(daemon_id, defn.get("capture_weight", 1)) for daemon_id, defn in self.definitions.items()])
+
+    def get_skill(self, daemon_id, skill_id):
+        """按 ID 查找技能定义 (O(1))"""
+        table = self.skill_tables.get(daemon_id)
+        return table.get(skill_id) if table else None
 
     def create_daemon(self, daemon_id, level=1):
         """创建一个新的守护程序实例"""
         if daemon_id not in self.definitions:
             return None
-        
-        defn = self.definitions[daemon_id]
-        daemon = {
-            "id": daemon_id,
-            "name": defn["name"],
-            "level": level,
-            "xp": 0,
-            "xp_to_next": self.calculate_xp_requirement(level),
-            "sp": 0, # 初始技能点
-            "total_sp": 0, # 总技能点
-            "stats": self.calculate_stats(daemon_id, level),
-            "learned_skills": [], # 已解锁的技能 ID 列表
-            "equipped_skills": [] # 战斗中挂载的技能 ID 列表 (最多 4 个)
-        }
-        return daemon
+        return new_daemon(daemon_id, self.definitions[daemon_id], level)
 
     def calculate_xp_requirement(self, level):
         """计算升级所需经验值"""
-        return int(100 * (level ** 1.5))
+        return xp_requirement(level)
 
     def calculate_stats(self, daemon_id, level):
         """根据等级计算属性"""
-        defn = self.definitions[daemon_id]
-        base = defn["base_stats"]
-        growth = defn["growth"]
-        
-        stats = {}
-        for stat, base_val in base.items():
-            stats[stat] = base_val + (level - 1) * growth.get(stat, 0)
-        
-        # 应用被动技能加成 (后续实现)
-        return stats
+        return daemon_stats(self.definitions[daemon_id], level)
 
     def add_xp(self, daemon_index, amount):
         """为指定的守护程序增加经验值"""
@@ -62,6 +51,7 @@ class DaemonManager:
                 daemon["stats"] = self.calculate_stats(daemon["id"], daemon["level"])
                 leveled_up = True
             
+            self.state.touch("daemons")
             return leveled_up
         return False
 
@@ -69,10 +59,10 @@ class DaemonManager:
         """学习/解锁一个技能"""
         if 0 <= daemon_index < len(self.state.daemons):
             daemon = self.state.daemons[daemon_index]
-            defn = self.definitions[daemon["id"]]
+            table = self.skill_tables[daemon["id"]]
             
             # 找到技能定义
-            skill_defn = next((s for s in defn["skill_tree"] if s["id"] == skill_id), None)
+            skill_defn = table.get(skill_id)
             if not skill_defn: return False, "技能不存在"
             
             # 检查是否已学习
@@ -81,9 +71,10 @@ class DaemonManager:
             # 检查 SP
             if daemon["sp"] < skill_defn["sp_cost"]: return False, "SP 不足"
             
-            # 检查前提条件
-            if skill_defn["req"] and skill_defn["req"] not in daemon["learned_skills"]:
-                return False, f"需要先解锁 {skill_defn['req']}"
+            # 检查前提条件 (前置链已在载入时展开)
+            missing = table.missing_prereqs(skill_id, daemon["learned_skills"])
+            if missing:
+                return False, f"需要先解锁 {missing[0]}"
             
             # 扣除 SP 并学习
             daemon["sp"] -= skill_defn["sp_cost"]
@@ -95,6 +86,7 @@ class DaemonManager:
             
             # 重新计算属性（以防有被动加成）
             daemon["stats"] = self.calculate_stats(daemon["id"], daemon["level"])
+            self.state.touch("daemons")
             return True, "学习成功"
         return False, "守护程序不存在"
 
@@ -107,6 +99,7 @@ class DaemonManager:
             if len(daemon["equipped_skills"]) >= 4: return False, "槽位已满"
             
             daemon["equipped_skills"].append(skill_id)
+            self.state.touch("daemons")
             return True, "挂载成功"
         return False, "失败"
 
@@ -1,102 +1,159 @@
-import random
+# 地块编码 (grid 中每格一个字节)
+WALL, FLOOR, EXIT, INFO, QUEST, LOOT, ENEMY = range(7)
+TILE_CHARS = "# E!?*%"
+# 地块编码 -> 显示字符，渲染时对整块缓冲区做一次 translate
+TILE_TABLE = bytes.maketrans(bytes(range(len(TILE_CHARS))), TILE_CHARS.encode("ascii"))
+
+# 随机字节 -> 方向下标 (取低 2 位)
+DIRECTION_TABLE = bytes(b & 3 for b in range(256))
+
+# 出口之外散布的符号及数量
+SYMBOLS = {
+    INFO: 2,  # 信息 !
+    QUEST: 2, # 任务 ?
+    LOOT: 3,  # 掉落 *
+    ENEMY: 3  # 敌人 %
+}
 
 class DungeonEngine:
+    """
+    地图按行优先存放在扁平的 bytearray 中 (下标 y * width + x，每格一个地块编码)，
+    1000x1000 的地图只占 1 MB，生成与渲染都是对整块缓冲区的批量操作。
+    (不使用 NumPy：随机漫步只能逐格进行，逐元素访问 ndarray 反而比 bytearray 慢。)
+    """
+
     def __init__(self, state, rng, width=20, height=10):
         self.state = state
-        self.rng = rng
+        self.rng = rng.stream("dungeon")
         self.width = width
         self.height = height
-        self.grid = []
+        self.grid = bytearray()
         self.player_pos = [0, 0]
         self.current_level = 1
         self.log = []
+        self.rows = []          # 每行的渲染缓存 (含玩家 @)
+        self.dirty_rows = set() # 自上次 render / render_diff 后变化的行
+
+    def index(self, x, y):
+        return y * self.width + x
 
     def generate_level(self, level_num=1):
+        width, height = self.width, self.height
         self.current_level = level_num
-        # 1. 初始化全为墙壁 #
-        self.grid = [["#" for _ in range(self.width)] for _ in range(self.height)]
-        
-        # 2. 随机漫步生成路径 (空地用空格 " " 表示)
-        x, y = self.width // 2, self.height // 2
+        # 1. 初始化全为墙壁
+        grid = bytearray(width * height)
+        # 可行走范围的掩码 (留出边界墙壁)：从内部格子走一步不会越出缓冲区，无需再判断坐标
+        inner_row = b"\0" + b"\1" * (width - 2) + b"\0"
+        inner = bytes(width) + inner_row * (height - 2) + bytes(width)
+
+        # 2. 随机漫步生成路径；floor 按首次到达的顺序记录每个空地格子 (不含重复)
+        x, y = width // 2, height // 2
         self.player_pos = [x, y]
-        
+        pos = y * width + x
+
         # 路径步数随层数略微增加
-        steps = (self.width * self.height) // 2 + (level_num * 2)
-        
-        walked_path = []
-        for _ in range(steps):
-            self.grid[y][x] = " " # 空地是空格，可以直接走
-            walked_path.append((x, y))
-            dx, dy = self.rng.choice([(0, 1), (0, -1), (1, 0), (-1, 0)])
-            # 留出边界墙壁
-            nx, ny = x + dx, y + dy
-            if 1 <= nx < self.width - 1 and 1 <= ny < self.height - 1:
-                x, y = nx, ny
-
-        # 3. 在路径上随机散布符号
-        # 过滤掉玩家初始位置
-        spawn_pool = [p for p in walked_path if p != tuple(self.player_pos)]
-        self.rng.rng.shuffle(spawn_pool)
-
-        # 放置出口 E
-        if spawn_pool:
-            ex, ey = spawn_pool.pop()
-            self.grid[ey][ex] = "E"
-
-        # 放置其他符号
-        symbols = {
-            "!": 2, # 信息
-            "?": 2, # 任务
-            "*": 3, # 掉落
-            "%": 3  # 敌人
-        }
-
-        for sym, count in symbols.items():
-            for _ in range(count):
-                if spawn_pool:
-                    sx, sy = spawn_pool.pop()
-                    self.grid[sy][sx] = sym
+        steps = (width * height) // 2 + (level_num * 2)
+
+        offsets = (width, -width, 1, -1) # 下、上、右、左
+        directions = self.rng.randbytes(steps).translate(DIRECTION_TABLE)
+        floor = []
+        for d in directions:
+            if not grid[pos]:
+                grid[pos] = FLOOR
+                floor.append(pos)
+            nxt = pos + offsets[d]
+            if inner[nxt]:
+                pos = nxt
+
+        # 3. 在空地上随机散布符号 (floor[0] 是玩家初始位置，不参与)
+        # 只需抽出 1 + sum(SYMBOLS) 个格子：部分 Fisher-Yates，不打乱整个列表
+        wanted = [EXIT]
+        for tile, count in SYMBOLS.items():
+            wanted += [tile] * count
+        picks = min(len(wanted), len(floor) - 1)
+        for i, r in enumerate(self.rng.random_batch(picks), 1):
+            j = i + int(r * (len(floor) - i))
+            floor[i], floor[j] = floor[j], floor[i]
+            grid[floor[i]] = wanted[i - 1]
+
+        self.grid = grid
+        # 新地图：所有行都需要重新渲染
+        self.rows = [""] * height
+        self.dirty_rows = set(range(height))
 
     def move_player(self, dx, dy):
         nx, ny = self.player_pos[0] + dx, self.player_pos[1] + dy
         
         if 0 <= nx < self.width and 0 <= ny < self.height:
-            target = self.grid[ny][nx]
+            pos = ny * self.width + nx
+            target = self.grid[pos]
             
-            if target == "#":
+            if target == WALL:
                 return "COLLISION", "撞到了防火墙。"
             
-            # 更新位置
+            # 更新位置 (离开的行与进入的行需要重新渲染)
+            self.dirty_rows.add(self.player_pos[1])
+            self.dirty_rows.add(ny)
             self.player_pos = [nx, ny]
             
-            if target == " ":
+            if target == FLOOR:
                 return "MOVE", ""
             
             # 触发事件后清除该格子的符号
-            self.grid[ny][nx] = " "
+            self.grid[pos] = FLOOR
             
-            if target == "!":
+            if target == INFO:
                 return "INFO", "你发现了一段残留的系统日志。"
-            elif target == "?":
+            elif target == QUEST:
                 return "QUEST", "检测到未完成的任务协议。"
-            elif target == "*":
+            elif target == LOOT:
                 return "LOOT", "成功回收了一件丢弃的硬件碎片。"
-            elif target == "%":
+            elif target == ENEMY:
                 return "ENEMY", "警告：遭遇安全防御程序！"
-            elif target == "E":
+            elif target == EXIT:
                 return "EXIT", "找到出口。准备进入下一层网络节点。"
                 
         return "IDLE", ""
 
+    def apply_rewards(self, result):
+        """根据移动结果发放资源奖励 (战斗、出口等流程由调用方处理)"""
+        if result == "LOOT":
+            self.state.resources["credits"] += 20
+            self.state.resources["data_scraps"] += 1
+        elif result == "INFO":
+            self.state.resources["hacking_xp"] += 10
+        elif result == "QUEST":
+            self.state.resources["compute"] += 2
+
+    def render_row(self, y):
+        start = y * self.width
+        row = self.grid[start:start + self.width].translate(TILE_TABLE).decode("ascii")
+        px, py = self.player_pos
+        if y == py:
+            return row[:px] + "@" + row[px + 1:]
+        return row
+
+    def _refresh_rows(self):
+        changed = sorted(self.dirty_rows)
+        if len(changed) == self.height:
+            # 新地图：整块缓冲区一次 translate 后按行切分
+            width = self.width
+            text = self.grid.translate(TILE_TABLE).decode("ascii")
+            self.rows = [text[start:start + width] for start in range(0, len(text), width)]
+            px, py = self.player_pos
+            row = self.rows[py]
+            self.rows[py] = row[:px] + "@" + row[px + 1:]
+        else:
+            for y in changed:
+                self.rows[y] = self.render_row(y)
+        self.dirty_rows.clear()
+        return changed
+
     def render(self):
-        """渲染成字符串供 UI 显示"""
-        lines = []
-        for y in range(self.height):
-            line = ""
-            for x in range(self.width):
-                if [x, y] == self.player_pos:
-                    line += "@"
-                else:
-                    line += self.grid[y][x]
-            lines.append(line)
-        return "\n".join(lines)
+        """渲染成字符串供 UI 显示 (只重新拼接变化的行)"""
+        self._refresh_rows()
+        return "\n".join(self.rows)
+
+    def render_diff(self):
+        """返回自上次调用以来变化的行 [(y, 行字符串), ...]，新地图时返回全部行"""
+        return [(y, self.rows[y]) for y in self._refresh_rows()]
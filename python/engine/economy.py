@@ -0,0 +1,165 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class EconomyModel:
+    """
+    编译后的经济模型。
+    资源映射为稠密下标，每个建筑的产出/消耗/存储加成展开为扁平的速率行，
+    每种资源的净产出向量只在建筑等级或定义变化时重新计算，
+    tick 时只需对有产出的资源做一次乘加与下限钳制。
+    """
+
+    def __init__(self):
+        self.resource_ids = []
+        self.resource_index = {}
+        self.building_ids = []
+        self.building_index = {}
+        self.base = array('d')
+        self.rows = None      # 每个建筑的净速率行 (产出 - 消耗)
+        self.storage = None   # 每个建筑的存储加成行
+        self.levels = array('d')
+        self.net = array('d')
+        self.floored = array('b') # 该资源是否被某个建筑消耗 (需要钳制到 0)
+        self.active = []      # [(res_id, rate, floored), ...] 仅包含净产出非零的资源
+        self.levels_source = None
+
+    def compile(self, definitions):
+        """从 definitions 编译下标表和速率行"""
+        res_defs = definitions.get("resources", {})
+        buildings = []
+        for category in ["hardware", "software"]:
+            buildings.extend(definitions.get("buildings", {}).get(category, {}).items())
+
+        # 资源下标：先是资源定义，再补上只在建筑效果中出现的资源
+        self.resource_ids = list(res_defs.keys())
+        for _, b_def in buildings:
+            effects = b_def.get("effects", {})
+            for key in ["auto_gen", "consume", "storage"]:
+                for res in effects.get(key, {}):
+                    if res not in self.resource_ids:
+                        self.resource_ids.append(res)
+        self.resource_index = {res: i for i, res in enumerate(self.resource_ids)}
+        self.building_ids = [b_id for b_id, _ in buildings]
+        self.building_index = {b_id: i for i, b_id in enumerate(self.building_ids)}
+
+        n_res = len(self.resource_ids)
+        self.base = array('d', [res_defs.get(res, {}).get("auto_gen", 0) for res in self.resource_ids])
+        rows = array('d', bytes(8 * n_res * len(buildings)))
+        storage = array('d', bytes(8 * n_res * len(buildings)))
+        self.floored = array('b', bytes(n_res))
+        for b, (_, b_def) in enumerate(buildings):
+            effects = b_def.get("effects", {})
+            offset = b * n_res
+            for res, rate in effects.get("auto_gen", {}).items():
+                rows[offset + self.resource_index[res]] += rate
+            for res, rate in effects.get("consume", {}).items():
+                rows[offset + self.resource_index[res]] -= rate
+                self.floored[self.resource_index[res]] = 1
+            for res, bonus in effects.get("storage", {}).items():
+                storage[offset + self.resource_index[res]] += bonus
+
+        if np is not None:
+            self.rows = np.frombuffer(rows, dtype=np.float64).reshape(len(buildings), n_res).copy()
+            self.storage = np.frombuffer(storage, dtype=np.float64).reshape(len(buildings), n_res).copy()
+        else:
+            self.rows = rows
+            self.storage = storage
+
+        self.levels = array('d', bytes(8 * len(buildings)))
+        self.levels_source = None
+        self.recompute()
+
+    def sync_levels(self, buildings):
+        """从 state.buildings 同步所有建筑等级 (读档或重新编译后调用)"""
+        for b, b_id in enumerate(self.building_ids):
+            self.levels[b] = buildings.get(b_id, 0)
+        self.levels_source = buildings
+        self.recompute()
+
+    def set_level(self, building_id, level):
+        """单个建筑等级变化时，只把差值乘到净产出向量上"""
+        b = self.building_index.get(building_id)
+        if b is None: return
+        delta = level - self.levels[b]
+        if not delta: return
+        self.levels[b] = level
+
+        n_res = len(self.resource_ids)
+        if np is not None:
+            net = np.frombuffer(self.net, dtype=np.float64)
+            net += delta * self.rows[b]
+        else:
+            offset = b * n_res
+            for i in range(n_res):
+                self.net[i] += delta * self.rows[offset + i]
+        self._update_active()
+
+    def recompute(self):
+        """按当前等级完整重算净产出向量"""
+        n_res = len(self.resource_ids)
+        if np is not None and len(self.levels):
+            levels = np.frombuffer(self.levels, dtype=np.float64)
+            net = np.frombuffer(self.base, dtype=np.float64) + levels @ self.rows
+            self.net = array('d', net.tobytes())
+        else:
+            self.net = array('d', self.base)
+            for b, level in enumerate(self.levels):
+                if level <= 0: continue
+                offset = b * n_res
+                for i in range(n_res):
+                    self.net[i] += level * self.rows[offset + i]
+        self._update_active()
+
+    def _update_active(self):
+        self.active = [
+            (res, rate, bool(self.floored[i]))
+            for i, (res, rate) in enumerate(zip(self.resource_ids, self.net))
+            if rate != 0
+        ]
+
+    def rates(self):
+        """每种资源的每秒净产出 {res_id: rate}，省略为零的资源"""
+        return {res: rate for res, rate, _ in self.active}
+
+    def storage_caps(self, base_caps):
+        """基础上限加上所有建筑的存储加成"""
+        caps = dict(base_caps)
+        n_res = len(self.resource_ids)
+        if np is not None and len(self.levels):
+            bonus = np.frombuffer(self.levels, dtype=np.float64) @ self.storage
+            for i, res in enumerate(self.resource_ids):
+                if bonus[i]:
+                    caps[res] = caps.get(res, 0) + float(bonus[i])
+        else:
+            for b, level in enumerate(self.levels):
+                if level <= 0: continue
+                offset = b * n_res
+                for i in range(n_res):
+                    bonus = self.storage[offset + i]
+                    if bonus:
+                        res = self.resource_ids[i]
+                        caps[res] = caps.get(res, 0) + bonus * level
+        return caps
+
+    def apply(self, resources, delta_time, caps=None):
+        """
+        按净产出推进 delta_time 秒；被消耗的资源不会低于 0。
+        传入 caps 时同时截断到存储上限，已触顶或已耗尽的资源不产生写入。
+        """
+        updated = {}
+        for res, rate, floored in self.active:
+            old = resources.get(res, 0)
+            value = old + rate * delta_time
+            if floored and value < 0:
+                value = 0
+            if caps and value > caps.get(res, value):
+                value = caps[res]
+            if value != old:
+                updated[res] = value
+        # 只写入变化的资源，且一次批量写入 (GameState 的资源字典会把整批变化记为同一个版本)
+        if updated:
+            resources.update(updated)
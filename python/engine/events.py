@@ -0,0 +1,80 @@
+from bisect import bisect_right, insort
+
+from utils.rng import WeightedSampler
+
+class RandomEvents:
+    """
+    编译后的随机事件表。
+    事件的 "requirements" 是资源下限：每种资源的阈值按大小排序，
+    poll 时只重新判断资源值跨越了阈值的事件，满足条件的集合增量维护；
+    集合变化后才重建别名表，因此每次抽取与事件总数无关。
+    """
+
+    def __init__(self):
+        self.events = []
+        self.thresholds = {}  # { res_id: [(amount, 事件序号), ...] } 按阈值排序
+        self.sampler = WeightedSampler()
+        self.reset_watch()
+
+    def compile(self, events):
+        self.events = list(events)
+        self.thresholds = {}
+        for index, event in enumerate(self.events):
+            for res, amount in event.get("requirements", {}).items():
+                insort(self.thresholds.setdefault(res, []), (amount, index))
+        self.reset_watch()
+
+    def reset_watch(self):
+        """清空观察快照，下次 poll 时所有事件都会重新判断"""
+        self.last_resources = {}
+        self.eligible = set()
+        self.dirty = set(range(len(self.events)))
+        self.stale = True # 别名表需要重建
+
+    def _met(self, event, resources):
+        for res, amount in event.get("requirements", {}).items():
+            if resources.get(res, 0) < amount:
+                return False
+        return True
+
+    def poll(self, state):
+        """根据资源变化更新满足条件的事件集合"""
+        resources = state.resources
+        for res, entries in self.thresholds.items():
+            value = resources.get(res, 0)
+            last = self.last_resources.get(res)
+            if last == value: continue
+            self.last_resources[res] = value
+            if last is None: continue # 首次观察：所有事件已在 dirty 中
+            low, high = min(last, value), max(last, value)
+            lo = bisect_right(entries, (low, float("inf")))
+            hi = bisect_right(entries, (high, float("inf")))
+            for _, index in entries[lo:hi]:
+                self.dirty.add(index)
+
+        for index in self.dirty:
+            met = self._met(self.events[index], resources)
+            if met != (index in self.eligible):
+                if met:
+                    self.eligible.add(index)
+                else:
+                    self.eligible.discard(index)
+                self.stale = True
+        self.dirty.clear()
+
+    def available(self, state):
+        """当前满足触发条件的事件及其权重 (按定义顺序)"""
+        self.poll(state)
+        return [(self.events[i], self.events[i].get("weight", 1)) for i in sorted(self.eligible)]
+
+    def current_sampler(self, state):
+        """返回与当前满足条件的集合对应的别名表 (集合变化后才重建)"""
+        self.poll(state)
+        if self.stale:
+            self.sampler.rebuild(self.available(state))
+            self.stale = False
+        return self.sampler
+
+    def sample(self, state, rng):
+        """抽取一个满足条件的事件，没有时返回 None"""
+        return self.current_sampler(state).sample(rng)
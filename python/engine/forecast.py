@@ -0,0 +1,143 @@
+import heapq
+import math
+
+class Forecaster:
+    """
+    基于当前净产出的可负担性与存储上限预测器。
+    重建时为每个建筑计算“何时变得可负担 / 何时又负担不起”、为每种资源计算“何时触顶”，
+    放入按时间排序的最小堆；之后每次 poll 只弹出到期的堆顶事件。
+    只有产出速率、存储上限变化或资源发生跳变 (购买、事件、奖励) 时才需要重建，
+    因此每 tick 的开销是 O(资源数 + 到期事件数)，而不是 O(建筑数 × 资源数)。
+    时间单位为 GameManager.clock 的游戏秒。
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.heap = []
+        self.affordable = set()
+        self.capped = set()
+        self.afford_at = {} # { building_id: 变得可负担的时间 (inf 表示按当前速率无法攒够) }
+        self.cap_at = {}    # { res_id: 触顶时间 }
+        self.origin = None  # 重建时的快照 (时间, 资源, 速率, 上限)
+        self.economy_active = None
+        self.rebuilds = 0
+
+    def invalidate(self):
+        self.origin = None
+
+    def _predict(self, res, now):
+        t0, values, rates, caps = self.origin
+        value = values.get(res, 0)
+        rate = rates.get(res, 0)
+        if rate:
+            value += rate * (now - t0)
+            if rate < 0 and value < 0:
+                value = 0
+        if res in caps and value > caps[res]:
+            value = caps[res]
+        return value
+
+    def _is_stale(self, now):
+        if self.origin is None:
+            return True
+        _, values, rates, caps = self.origin
+        state = self.manager.state
+        if state.storage_caps is not caps or self.manager.economy.active is not self.economy_active:
+            return True
+        if state.resources.keys() != values.keys():
+            return True
+        for res, actual in state.resources.items():
+            predicted = self._predict(res, now)
+            if abs(actual - predicted) > 1e-6 * max(1, abs(predicted)):
+                return True
+        return False
+
+    def rebuild(self, now):
+        state = self.manager.state
+        rates = self.manager.net_rates()
+        caps = state.storage_caps
+        self.origin = (now, dict(state.resources), rates, caps)
+        self.economy_active = self.manager.economy.active
+        self.heap = []
+        self.affordable = set()
+        self.capped = set()
+        self.afford_at = {}
+        self.cap_at = {}
+        self.rebuilds += 1
+
+        for res, value in state.resources.items():
+            rate = rates.get(res, 0)
+            if res not in caps: continue
+            if value >= caps[res]:
+                self.capped.add(res)
+                self.cap_at[res] = now
+            elif rate > 0:
+                self.cap_at[res] = now + (caps[res] - value) / rate
+                self.heap.append((self.cap_at[res], "cap", res))
+            else:
+                self.cap_at[res] = math.inf
+
+        for b_id in self.manager.building_defs:
+            costs = self.manager.building_cost(b_id)
+            # 可负担区间 [start, end)：正产出的资源决定何时攒够，净消耗的资源决定何时又不够
+            start, end = now, math.inf
+            for res, amount in costs.items():
+                have = state.resources.get(res, 0)
+                rate = rates.get(res, 0)
+                if have >= amount:
+                    if rate < 0:
+                        end = min(end, now + (have - amount) / -rate)
+                elif rate > 0 and amount <= caps.get(res, math.inf):
+                    start = max(start, now + (amount - have) / rate)
+                else:
+                    start = math.inf
+            if start >= end:
+                start = math.inf
+
+            self.afford_at[b_id] = start
+            if start == now:
+                self.affordable.add(b_id)
+            elif start != math.inf:
+                self.heap.append((start, "afford", b_id))
+            if start != math.inf and end != math.inf:
+                self.heap.append((end, "lose", b_id))
+        heapq.heapify(self.heap)
+
+    def poll(self, now=None):
+        """推进到 now (默认为 manager.clock)，必要时重建，返回本次到期的事件列表"""
+        if now is None:
+            now = self.manager.clock
+        if self._is_stale(now):
+            self.rebuild(now)
+
+        events = []
+        while self.heap and self.heap[0][0] <= now:
+            _, kind, key = heapq.heappop(self.heap)
+            if kind == "afford":
+                self.affordable.add(key)
+            elif kind == "lose":
+                self.affordable.discard(key)
+                self.afford_at[key] = math.inf
+            elif kind == "cap":
+                self.capped.add(key)
+            events.append((kind, key))
+        return events
+
+    def is_affordable(self, building_id):
+        return building_id in self.affordable
+
+    def seconds_until_affordable(self, building_id, now=None):
+        """距离可负担还有多少秒 (已可负担返回 0，无法攒够返回 inf)"""
+        if building_id in self.affordable:
+            return 0
+        if now is None:
+            now = self.manager.clock
+        return max(0, self.afford_at.get(building_id, math.inf) - now)
+
+    def seconds_until_cap(self, res_id, now=None):
+        """距离资源触顶还有多少秒 (已触顶返回 0，不会触顶返回 inf)"""
+        if res_id in self.capped:
+            return 0
+        if now is None:
+            now = self.manager.clock
+        return max(0, self.cap_at.get(res_id, math.inf) - now)
@@ -0,0 +1,70 @@
+from collections import deque
+from itertools import islice
+
+LOG_CAPACITY = 500
+COMBAT_LOG_CAPACITY = 50
+
+class StoryLog:
+    """
+    剧情日志模型：固定容量的环形缓冲区，超出容量时最早的条目被丢弃。
+    每条记录为 (seq, kind, text)，seq 单调递增且连续，视图据此定位窗口；
+    kind 为 "story" / "move" / "quest" / "system"。
+    存档时以 [seq, kind, text] 的紧凑数组保存。
+    """
+
+    def __init__(self, capacity=LOG_CAPACITY):
+        self.entries = deque(maxlen=capacity)
+        self.next_seq = 0
+        self.epoch = 0 # 整体替换 (读档) 时递增，视图据此重建
+
+    def append(self, kind, text):
+        entry = (self.next_seq, kind, text)
+        self.entries.append(entry)
+        self.next_seq += 1
+        return entry
+
+    @property
+    def first_seq(self):
+        return self.entries[0][0] if self.entries else self.next_seq
+
+    @property
+    def last_seq(self):
+        """最新一条的 seq (为空时为 first_seq - 1)"""
+        return self.next_seq - 1
+
+    def last_text(self, kind=None):
+        for seq, entry_kind, text in reversed(self.entries):
+            if kind is None or entry_kind == kind:
+                return text
+        return None
+
+    def slice(self, start_seq, end_seq):
+        """返回 seq 在 [start_seq, end_seq) 内的条目"""
+        first = self.first_seq
+        start = max(start_seq, first) - first
+        end = max(min(end_seq, self.next_seq) - first, start)
+        return list(islice(self.entries, start, end))
+
+    def clear(self):
+        """清空记录；seq 继续递增，epoch 递增通知视图重建"""
+        self.entries.clear()
+        self.epoch += 1
+
+    def to_data(self):
+        return [list(entry) for entry in self.entries]
+
+    def load_data(self, data):
+        self.entries.clear()
+        for seq, kind, text in data:
+            self.entries.append((seq, kind, text))
+        self.next_seq = self.entries[-1][0] + 1 if self.entries else 0
+        self.epoch += 1
+
+class CombatLog(StoryLog):
+    """
+    战斗日志：同样是带 seq 的有界缓冲区，kind 为 "system" / "player" / "enemy"。
+    每场战斗开始时 clear，视图只追加比已渲染 seq 更新的条目。
+    """
+
+    def __init__(self, capacity=COMBAT_LOG_CAPACITY):
+        super().__init__(capacity)
@@ -1,9 +1,14 @@
-import json
+import math
+from engine.economy import EconomyModel
+from engine.forecast import Forecaster
+from engine.events import RandomEvents
+from utils.bundle import parse_data
 
 class GameManager:
     def __init__(self, state, rng):
         self.state = state
         self.rng = rng
+        self.events_rng = rng.stream("events")
         self.definitions = {
             "resources": {},
             "actions": {},
@@ -11,27 +16,42 @@ class GameManager:
             "buildings": {},
             "artifacts": {}
         }
+        self.economy = EconomyModel()
+        self.events = RandomEvents() # 随机事件：满足条件的集合增量维护，抽取 O(1)
+        self.building_defs = {} # { "building_id": b_def }，跨分类的扁平索引
+        self.cost_cache = {} # { "building_id": (level, { res: 单级成本 }) }
+        self.clock = 0.0 # 本次会话累计的游戏秒数 (供 Forecaster 使用，不存档)
+        self.forecaster = Forecaster(self)
 
     def load_definitions(self, resources_json, events_json, buildings_json=None, artifacts_json=None):
-        self.definitions["resources"] = json.loads(resources_json)
-        self.definitions["events"] = json.loads(events_json)
+        """参数可以是 JSON 字符串，也可以是内容包中已解析的对象"""
+        self.definitions["resources"] = parse_data(resources_json)
+        self.definitions["events"] = parse_data(events_json)
         if buildings_json:
-            self.definitions["buildings"] = json.loads(buildings_json)
+            self.definitions["buildings"] = parse_data(buildings_json)
         if artifacts_json:
-            self.definitions["artifacts"] = json.loads(artifacts_json)
+            self.definitions["artifacts"] = parse_data(artifacts_json)
+        self.building_defs = {}
+        for cat in ["hardware", "software"]:
+            self.building_defs.update(self.definitions["buildings"].get(cat, {}))
+        self.cost_cache = {}
+        self.events.compile(self.definitions["events"])
+        self.economy.compile(self.definitions)
+        self.forecaster.invalidate()
+
+    def sync_economy(self):
+        """读档或替换 state.buildings 后，将建筑等级同步到编译后的经济模型"""
+        if self.economy.levels_source is not self.state.buildings:
+            self.economy.sync_levels(self.state.buildings)
 
     def tick(self, delta_time):
         """主循环逻辑，计算资源产出"""
         self.state.tick_count += 1
+        self.clock += delta_time
         
-        # 1. 基础产出 (来自资源定义)
-        for res_id, res_def in self.definitions["resources"].items():
-            if "auto_gen" in res_def:
-                amount = res_def["auto_gen"] * delta_time
-                self.state.resources[res_id] = self.state.resources.get(res_id, 0) + amount
-
-        # 2. 建筑产出与消耗
-        self.apply_building_effects(delta_time)
+        # 1-2. 基础产出、建筑产出与消耗 (编译后的净产出向量)
+        self.sync_economy()
+        self.economy.apply(self.state.resources, delta_time, self.state.storage_caps)
 
         # 3. 强制执行存储上限
         self.apply_storage_caps()
@@ -46,37 +66,37 @@ class GameManager:
     def set_npc_manager(self, npc_mgr):
         self.npc_mgr = npc_mgr
 
+    def set_story_manager(self, story_mgr):
+        self.story_mgr = story_mgr
+
     def check_story_triggers(self):
         """基于游戏状态触发特定的剧情节点"""
-        # 仅在主循环中偶尔检查，避免性能损耗
-        if self.state.tick_count % 5 != 0: return
-
-        # 优先级 1: 关键剧情触发 (仅当当前在 energy_stable 时)
-        if self.state.current_story_node == "energy_stable":
-            # 发现创世日志后的警告
-            if "project_genesis_log" in self.state.artifacts and "echo_genesis_warned" not in self.state.story_flags:
-                self.state.current_story_node = "echo_genesis_warning"
-                self.state.story_flags.append("echo_genesis_warned")
+        # 优先级 1: 关键剧情触发 (规则声明在 story.json 的 "trigger" 字段中)
+        # 规则只在其订阅的资源/档案/标记变化时重新求值，因此可以每 tick 检查
+        if hasattr(self, 'story_mgr'):
+            rule = self.story_mgr.triggers.poll(self.state)
+            if rule:
+                rule.fire(self.state)
                 return
 
-            # 算力突破 500 后的引导
-            if self.state.resources.get("compute", 0) >= 500 and "echo_high_compute_triggered" not in self.state.story_flags:
-                self.state.current_story_node = "echo_high_compute"
-                self.state.story_flags.append("echo_high_compute_triggered")
-                return
+        # 随机闲聊仅偶尔检查
+        if self.state.tick_count % 5 != 0: return
 
-            # 优先级 2: 使用 NPC 管理器处理随机闲聊
-            if hasattr(self, 'npc_mgr'):
-                idle_pool = ["echo_idle_1", "echo_idle_2", "echo_idle_3"]
-                self.npc_mgr.trigger_random_chatter(idle_pool, chance=0.01)
+        # 优先级 2: 使用 NPC 管理器处理随机闲聊
+        if self.state.current_story_node == "energy_stable" and hasattr(self, 'npc_mgr'):
+            idle_pool = ["echo_idle_1", "echo_idle_2", "echo_idle_3"]
+            self.npc_mgr.trigger_random_chatter(idle_pool, chance=0.01)
 
 
     def apply_building_effects(self, delta_time):
-        """计算所有建筑的产出、消耗和存储加成"""
-        # 重置存储上限为基础值 (这里需要一个基础值定义，或者在 state.reset 中定义)
-        # 简单起见，我们假设基础值已经在 state.storage_caps 中，我们每次 tick 根据建筑重新计算它
-        # 或者更高效的做法是：只在建筑升级时更新 storage_caps。
-        
+        """
+        逐个遍历建筑定义计算产出与消耗 (字典遍历的参考实现)。
+        tick 已改用 EconomyModel，此方法保留用于基准对比与结果校验。
+        与 EconomyModel 相同：先按资源汇总全部建筑的净变化，被消耗的资源再按净值钳制到 0
+        (而不是逐个建筑扣除后钳制)。
+        """
+        net = {}
+        consumed = set()
         for category in ["hardware", "software"]:
             if category not in self.definitions["buildings"]: continue
             for b_id, b_def in self.definitions["buildings"][category].items():
@@ -86,14 +106,19 @@ class GameManager:
                 effects = b_def.get("effects", {})
                 
                 # 处理自动产出
-                if "auto_gen" in effects:
-                    for res, rate in effects["auto_gen"].items():
-                        self.state.resources[res] = self.state.resources.get(res, 0) + (rate * level * delta_time)
+                for res, rate in effects.get("auto_gen", {}).items():
+                    net[res] = net.get(res, 0) + rate * level * delta_time
                 
-                # 处理消耗 (如果资源不足，建筑可能停止工作，这里简单处理：允许负数或直接扣除)
-                if "consume" in effects:
-                    for res, rate in effects["consume"].items():
-                        self.state.resources[res] = max(0, self.state.resources.get(res, 0) - (rate * level * delta_time))
+                # 处理消耗
+                for res, rate in effects.get("consume", {}).items():
+                    net[res] = net.get(res, 0) - rate * level * delta_time
+                    consumed.add(res)
+
+        for res, delta in net.items():
+            value = self.state.resources.get(res, 0) + delta
+            if res in consumed and value < 0:
+                value = 0
+            self.state.resources[res] = value
 
     def apply_storage_caps(self):
         """确保资源不超过上限"""
@@ -111,30 +136,80 @@ class GameManager:
             "credits": 1000,
             "compute": 50
         }
-        new_caps = base_caps.copy()
-        
-        for category in ["hardware", "software"]:
-            if category not in self.definitions["buildings"]: continue
-            for b_id, b_def in self.definitions["buildings"][category].items():
-                level = self.state.buildings.get(b_id, 0)
-                if level <= 0: continue
-                
-                storage_effects = b_def.get("effects", {}).get("storage", {})
-                for res, bonus in storage_effects.items():
-                    new_caps[res] = new_caps.get(res, 0) + (bonus * level)
-        
-        self.state.storage_caps = new_caps
+        self.sync_economy()
+        self.state.storage_caps = self.economy.storage_caps(base_caps)
 
-    def build(self, building_id):
-        """尝试建造或升级建筑"""
-        # 查找建筑定义
-        b_def = None
-        for cat in ["hardware", "software"]:
-            if building_id in self.definitions["buildings"].get(cat, {}):
-                b_def = self.definitions["buildings"][cat][building_id]
-                break
-        
+    def cost_multiplier(self, building_id):
+        """建筑的成本倍率；低于 1 (越升级越便宜) 的定义视为 1，否则批量购买没有上限"""
+        return max(1, self.building_defs[building_id].get("cost_multiplier", 1.5))
+
+    def building_cost(self, building_id, count=1):
+        """
+        从当前等级起连续升级 count 级的总成本。
+        单级成本 base * multiplier ** level 按建筑缓存，只有该建筑等级变化时才失效；
+        多级成本是几何级数求和：unit * (multiplier ** count - 1) / (multiplier - 1)。
+        """
+        b_def = self.building_defs.get(building_id)
+        if not b_def: return None
+
+        level = self.state.buildings.get(building_id, 0)
+        cached = self.cost_cache.get(building_id)
+        if cached is None or cached[0] != level:
+            multiplier = self.cost_multiplier(building_id)
+            unit_costs = {res: base_amount * (multiplier ** level) for res, base_amount in b_def["cost"].items()}
+            cached = (level, unit_costs)
+            self.cost_cache[building_id] = cached
+
+        unit_costs = cached[1]
+        if count == 1:
+            return unit_costs
+
+        multiplier = self.cost_multiplier(building_id)
+        if multiplier == 1:
+            factor = count
+        else:
+            factor = (multiplier ** count - 1) / (multiplier - 1)
+        return {res: amount * factor for res, amount in unit_costs.items()}
+
+    def can_afford(self, costs):
+        for res, amount in costs.items():
+            if self.state.resources.get(res, 0) < amount:
+                return False
+        return True
+
+    def max_affordable(self, building_id):
+        """以当前资源最多能连续升级多少级 (几何级数的闭式解)"""
+        b_def = self.building_defs.get(building_id)
+        if not b_def: return 0
+        if "requires_artifact" in b_def and b_def["requires_artifact"] not in self.state.artifacts:
+            return 0
+
+        multiplier = self.cost_multiplier(building_id)
+        best = None
+        for res, unit in self.building_cost(building_id).items():
+            if unit <= 0: continue
+            have = max(0, self.state.resources.get(res, 0))
+            if multiplier == 1:
+                n = int(have // unit)
+            else:
+                # unit * (m^n - 1) / (m - 1) <= have  =>  n <= log(1 + have * (m - 1) / unit) / log(m)
+                n = int(math.log1p(have * (multiplier - 1) / unit) / math.log(multiplier))
+            best = n if best is None else min(best, n)
+        if best is None:
+            return 0
+
+        # 修正浮点误差
+        while best > 0 and not self.can_afford(self.building_cost(building_id, best)):
+            best -= 1
+        while self.can_afford(self.building_cost(building_id, best + 1)):
+            best += 1
+        return best
+
+    def build(self, building_id, count=1):
+        """尝试建造或连续升级 count 级建筑"""
+        b_def = self.building_defs.get(building_id)
         if not b_def: return False, "建筑不存在"
+        if count < 1: return False, "无效的数量"
 
         # 检查前置条件 (Artifacts)
         if "requires_artifact" in b_def:
@@ -142,12 +217,9 @@ class GameManager:
                 return False, "缺少必要的数据档案"
         
         current_level = self.state.buildings.get(building_id, 0)
-        multiplier = b_def.get("cost_multiplier", 1.5)
         
-        # 计算当前等级的成本
-        actual_costs = {}
-        for res, base_amount in b_def["cost"].items():
-            actual_costs[res] = base_amount * (multiplier ** current_level)
+        # 计算 count 级的总成本
+        actual_costs = self.building_cost(building_id, count)
         
         # 检查资源
         for res, amount in actual_costs.items():
@@ -159,29 +231,111 @@ class GameManager:
             self.state.resources[res] -= amount
         
         # 升级
-        self.state.buildings[building_id] = current_level + 1
+        new_level = current_level + count
+        self.state.buildings[building_id] = new_level
+        self.cost_cache.pop(building_id, None)
+        self.sync_economy()
+        self.economy.set_level(building_id, new_level)
         
-        # 更新上限
+        # 更新上限 (批量购买也只更新一次)
         self.update_storage_caps()
         
         return True, "升级成功"
 
+    def net_rates(self):
+        """汇总每种资源的每秒净产出 (基础产出 + 建筑产出 - 建筑消耗)"""
+        self.sync_economy()
+        return self.economy.rates()
+
+    def advance(self, elapsed_seconds):
+        """
+        离线追赶：一次性结算 elapsed_seconds 秒的进度，返回“离线期间”摘要。
+        产出是分段线性的，只在某个资源触顶 (storage_caps) 或被消耗殆尽时切分区间；
+        随机事件与 tick 一样每 60 tick 抽取一次，效果在发生的时刻计入，
+        因此耗时只随事件次数 (每分钟一次) 增长，与 tick 数无关。
+        """
+        ticks = int(elapsed_seconds)
+        if ticks <= 0:
+            return None
+
+        resources = self.state.resources
+        before = dict(resources)
+
+        # 与 tick 一致：先把超出上限的资源压回上限
+        self.apply_storage_caps()
+
+        rates = self.net_rates()
+        events = {}
+        elapsed = 0
+        # 第 k 个 tick 结束时 tick_count + k 是 60 的倍数则抽取一次事件
+        for roll_at in range(60 - self.state.tick_count % 60, ticks + 1, 60):
+            self.integrate(rates, roll_at - elapsed)
+            elapsed = roll_at
+            event = self.events.sample(self.state, self.events_rng)
+            if event is not None:
+                event_id = event.get("id", "unknown")
+                events[event_id] = events.get(event_id, 0) + 1
+                self.trigger_event(event)
+                self.apply_storage_caps()
+        self.integrate(rates, elapsed_seconds - elapsed)
+
+        self.state.tick_count += ticks
+        self.clock += elapsed_seconds
+        self.apply_storage_caps()
+
+        gains = {}
+        for res, amount in resources.items():
+            delta = amount - before.get(res, 0)
+            if delta:
+                gains[res] = delta
+
+        return {
+            "elapsed": elapsed_seconds,
+            "ticks": ticks,
+            "gains": gains,
+            "events": events
+        }
+
+    def integrate(self, rates, seconds):
+        """按净产出 rates 解析推进 seconds 秒，资源到达上限或归零时切分区间并钉在边界上"""
+        resources = self.state.resources
+        caps = self.state.storage_caps
+        active = {res: rate for res, rate in rates.items() if rate != 0}
+        remaining = float(seconds)
+        while remaining > 0 and active:
+            # 找到最近的断点：资源到达上限 (正产出) 或归零 (净消耗)
+            step = remaining
+            hit = []
+            for res, rate in active.items():
+                value = resources.get(res, 0)
+                if rate > 0:
+                    if res not in caps: continue
+                    t = max(0, (caps[res] - value) / rate)
+                else:
+                    t = max(0, value / -rate)
+                if t < step:
+                    step = t
+                    hit = [res]
+                elif t == step:
+                    hit.append(res)
+
+            for res, rate in active.items():
+                resources[res] = resources.get(res, 0) + rate * step
+
+            # 到达边界的资源此后保持不变，直接钉在边界上并移出活动集合
+            for res in hit:
+                resources[res] = caps[res] if active[res] > 0 else 0
+                del active[res]
+            remaining -= step
+
+    def available_events(self):
+        """当前满足触发条件的事件及其权重"""
+        return self.events.available(self.state)
+
     def check_random_events(self):
-        # 简单的权重随机事件系统
-        available_events = []
-        for event in self.definitions["events"]:
-            # 检查事件触发条件
-            met = True
-            if "requirements" in event:
-                for res, amount in event["requirements"].items():
-                    if self.state.resources.get(res, 0) < amount:
-                        met = False
-                        break
-            if met:
-                available_events.append((event, event.get("weight", 1)))
-        
-        if available_events:
-            event = self.rng.weighted_choice(available_events)
+        # 权重随机事件：满足条件的集合随资源跨越阈值增量更新，别名表抽取
+        event = self.events.sample(self.state, self.events_rng)
+        if event is not None:
             self.trigger_event(event)
 
     def trigger_event(self, event):
@@ -1,8 +1,7 @@
-import random
-
 class NPCManager:
-    def __init__(self, state, story_manager, i18n):
+    def __init__(self, state, story_manager, i18n, rng):
         self.state = state
+        self.rng = rng.stream("npc")
         self.story = story_manager
         self.i18n = i18n
         self.npcs = {
@@ -44,8 +43,8 @@ class NPCManager:
         if self.state.current_story_node != "energy_stable":
             return False
             
-        if random.random() < chance:
-            self.state.current_story_node = random.choice(pool)
+        if self.rng.random() < chance:
+            self.state.current_story_node = self.rng.choice(pool)
             return True
         return False
 
@@ -56,11 +55,11 @@ class NPCManager:
 
         # 这里可以根据 event_type 扩展更多 NPC 的逻辑
         if event_type == "build_complete":
-            if random.random() < 0.3:
+            if self.rng.random() < 0.3:
                 self.state.current_story_node = "echo_react_build"
                 return True
         elif event_type == "dungeon_return":
-            if random.random() < 0.3:
+            if self.rng.random() < 0.3:
                 self.state.current_story_node = "echo_react_dungeon"
                 return True
         return False
@@ -1,4 +1,4 @@
-import json
+from utils.bundle import parse_data
 
 class QuestManager:
     def __init__(self, state):
@@ -6,7 +6,7 @@ class QuestManager:
         self.definitions = {}
 
     def load_definitions(self, quests_json):
-        self.definitions = json.loads(quests_json)
+        self.definitions = parse_data(quests_json)
 
     def accept_quest(self, quest_id):
         """接受一个任务"""
@@ -51,6 +51,8 @@ class QuestManager:
             if quest["progress"] >= defn["target_amount"]:
                 quest["completed"] = True
                 changed = True
+        if changed:
+            self.state.touch("active_quests")
         return changed
 
     def claim_reward(self, quest_id):
@@ -0,0 +1,96 @@
+"""
+输入录制与无头回放。
+
+录像 = 起始存档 + 种子 + 每个 tick 的间隔 (毫秒) + 带 tick 序号的输入指令 + 结束时的状态哈希。
+回放时用同样的引擎类从起始存档出发，按顺序重放 tick 与指令，最后比较状态哈希。
+随机性全部来自存档中记录了位置的命名随机流，因此结果逐位可复现。
+
+导出的录像字符串为 CYREPLAY-<base64(紧凑存档编码)>，可直接保存为文件作为回归/性能用例。
+
+用法 (在 python/ 目录下):
+    python -m engine.replay session.cyreplay [--budget 2.0] [--expect HASH]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from engine.state import GameState
+from engine.manager import GameManager
+from engine.story import StoryManager
+from engine.dungeon import DungeonEngine
+from engine.daemon import DaemonManager
+from engine.combat import CombatEngine
+from engine.quest import QuestManager
+from engine.session import GameSession, state_hash, loads_replay
+from utils.rng import SeededRNG
+from utils.bundle import load_content
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data"))
+
+def build_session(seed, start, data_dir=DATA_DIR):
+    """按 main.py 的方式组装引擎并载入起始存档 (不依赖浏览器)"""
+    state = GameState()
+    rng = SeededRNG(seed)
+    state.attach_rng(rng)
+    manager = GameManager(state, rng)
+    story = StoryManager(state)
+    manager.set_story_manager(story)
+    daemon_mgr = DaemonManager(state)
+    quest_mgr = QuestManager(state)
+    combat = CombatEngine(state, daemon_mgr, lambda: None, rng, quest_mgr)
+
+    _, content = load_content(start.get("language", "en"), os.path.join(data_dir, "bundle.bin"))
+    manager.load_definitions(content["resources"], content["events"], content["buildings"], content["artifacts"])
+    story.load_nodes(content["story"])
+    daemon_mgr.load_definitions(content["daemons"])
+    quest_mgr.load_definitions(content["quests"])
+
+    state.from_dict(json.loads(json.dumps(start)))
+    # 地牢在读档后第一次使用时生成 (与 main.make_dungeon 一致)
+    dungeon = DungeonEngine(state, rng)
+    dungeon.generate_level(1)
+    return GameSession(state, manager, story, dungeon, daemon_mgr, combat, quest_mgr)
+
+def replay(data, data_dir=DATA_DIR):
+    """以最高速度重放录像，返回 (session, 状态哈希)"""
+    session = build_session(data["seed"], data["start"], data_dir)
+    commands = data["commands"]
+    next_cmd = 0
+    for index, dt_ms in enumerate(data["ticks"]):
+        while next_cmd < len(commands) and commands[next_cmd][0] <= index:
+            _, op, *args = commands[next_cmd]
+            session.apply(op, args)
+            next_cmd += 1
+        session.tick(dt_ms)
+    for _, op, *args in commands[next_cmd:]:
+        session.apply(op, args)
+    return session, state_hash(session.state)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无头回放录像并校验最终状态哈希")
+    parser.add_argument("path")
+    parser.add_argument("--expect", help="期望的状态哈希 (默认使用录像中记录的哈希)")
+    parser.add_argument("--budget", type=float, help="回放耗时上限 (秒)")
+    args = parser.parse_args(argv)
+
+    with open(args.path, "r", encoding="utf-8") as f:
+        data = loads_replay(f.read())
+    start = time.perf_counter()
+    session, digest = replay(data)
+    wall = time.perf_counter() - start
+
+    expected = args.expect or data.get("hash")
+    game_seconds = sum(data["ticks"]) / 1000
+    print(f"ticks={len(data['ticks'])} commands={len(data['commands'])} "
+          f"game={game_seconds / 3600:.2f}h wall={wall:.3f}s ({game_seconds / max(wall, 1e-9):,.0f}x)")
+    print(f"hash={digest} expected={expected}")
+    ok = digest == expected
+    if args.budget is not None and wall > args.budget:
+        print(f"over budget: {wall:.3f}s > {args.budget:.3f}s")
+        ok = False
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""
+守护程序实例 (存在 state.daemons 中的字典) 的构造与属性计算。
+只依赖职业定义，不需要技能表，因此开新档赠送初始守护程序时不必加载守护程序子系统
+(engine/daemon.py 与 engine/skills.py 按需加载，见 main.py)。
+"""
+
+def xp_requirement(level):
+    """计算升级所需经验值"""
+    return int(100 * (level ** 1.5))
+
+def daemon_stats(defn, level):
+    """根据等级计算属性"""
+    base = defn["base_stats"]
+    growth = defn["growth"]
+    
+    stats = {}
+    for stat, base_val in base.items():
+        stats[stat] = base_val + (level - 1) * growth.get(stat, 0)
+    
+    # 应用被动技能加成 (后续实现)
+    return stats
+
+def new_daemon(daemon_id, defn, level=1):
+    """创建一个新的守护程序实例"""
+    return {
+        "id": daemon_id,
+        "name": defn["name"],
+        "level": level,
+        "xp": 0,
+        "xp_to_next": xp_requirement(level),
+        "sp": 0, # 初始技能点
+        "total_sp": 0, # 总技能点
+        "stats": daemon_stats(defn, level),
+        "learned_skills": [], # 已解锁的技能 ID 列表
+        "equipped_skills": [] # 战斗中挂载的技能 ID 列表 (最多 4 个)
+    }
@@ -0,0 +1,167 @@
+import base64
+import hashlib
+import json
+
+from utils.savecodec import encode_save, decode_save
+
+REPLAY_PREFIX = "CYREPLAY-"
+REPLAY_VERSION = 1
+
+class GameSession:
+    """
+    玩家输入的引擎层入口：界面 (main.py) 与无头回放 (engine/replay.py) 走同一套逻辑。
+    每个方法只修改游戏状态并返回结果，日志与重绘由调用方负责。
+    设置 recorder 后，每次 tick 与每条输入都会被记录 (见 InputRecorder)。
+    dungeon / daemon_mgr / combat / quest_mgr 可以是延迟代理，构造时不会访问它们。
+    """
+
+    def __init__(self, state, manager, story, dungeon, daemon_mgr, combat, quest_mgr):
+        self.state = state
+        self.manager = manager
+        self.story = story
+        self.dungeon = dungeon
+        self.daemon_mgr = daemon_mgr
+        self.combat = combat
+        self.quest_mgr = quest_mgr
+        self.recorder = None
+        self.quest_check_version = 0 # 上次检查收集任务时的状态版本
+
+    def _record(self, op, *args):
+        if self.recorder is not None:
+            self.recorder.command(op, *args)
+
+    def tick(self, dt_ms):
+        """推进一个游戏循环 tick；间隔以整数毫秒给出，回放时可逐位复现"""
+        if self.recorder is not None:
+            self.recorder.tick(dt_ms)
+        self.manager.tick(dt_ms / 1000)
+
+        # 收集任务只在碎片数量或任务列表变化后才需要重新检查
+        state = self.state
+        if state.active_quests and ("active_quests" in state.changed_since(self.quest_check_version) or
+                "data_scraps" in state.keys_changed_since("resources", self.quest_check_version)):
+            self.quest_mgr.update_progress("collect", "data_scraps")
+        self.quest_check_version = state.version
+
+    def move(self, dx, dy):
+        """地牢移动，返回 (结果, 消息)；遇敌时开始战斗"""
+        self._record("move", dx, dy)
+        dungeon = self.dungeon
+        result, msg = dungeon.move_player(dx, dy)
+
+        # 根据结果给予奖励
+        dungeon.apply_rewards(result)
+        if result == "LOOT":
+            self.quest_mgr.update_progress("collect", "data_scraps")
+        elif result == "ENEMY":
+            # 切换到战斗模式，战斗逻辑由 CombatEngine 接管
+            self.combat.start_combat("SECURITY_NODE", dungeon.current_level)
+        elif result == "EXIT":
+            dungeon.generate_level(dungeon.current_level + 1)
+            self.quest_mgr.update_progress("explore", amount=dungeon.current_level)
+        return result, msg
+
+    def story_choice(self, node_id, choice_id):
+        self._record("story", node_id, choice_id)
+        # 检查是否有任务接受逻辑
+        current_node = self.story.story_nodes.get(node_id)
+        if current_node:
+            action = current_node["actions"].get(choice_id)
+            if action and "quest_id" in action:
+                self.quest_mgr.accept_quest(action["quest_id"])
+                # 特殊逻辑：如果是黑市购买守护程序
+                if action["quest_id"] == "unlock_data_ghost":
+                    new_daemon = self.daemon_mgr.create_daemon("data_ghost", level=1)
+                    if new_daemon:
+                        self.state.daemons.append(new_daemon)
+                        self.quest_mgr.update_progress("special", amount=1)
+        return self.story.trigger_choice(choice_id)
+
+    def build(self, b_id, count):
+        self._record("build", b_id, count)
+        return self.manager.build(b_id, count)
+
+    def combat_action(self, action_id):
+        self._record("combat", action_id)
+        self.combat.execute_player_action(action_id)
+
+    def switch_daemon(self, index):
+        self._record("daemon", index)
+        self.state.active_daemon_index = index
+
+    def claim_quest(self, quest_id):
+        self._record("claim", quest_id)
+        return self.quest_mgr.claim_reward(quest_id)
+
+    def learn_skill(self, daemon_index, skill_id):
+        self._record("skill", daemon_index, skill_id)
+        return self.daemon_mgr.learn_skill(daemon_index, skill_id)
+
+    # 回放时按指令名分派
+    COMMANDS = {
+        "move": "move",
+        "story": "story_choice",
+        "build": "build",
+        "combat": "combat_action",
+        "daemon": "switch_daemon",
+        "claim": "claim_quest",
+        "skill": "learn_skill",
+    }
+
+    def apply(self, op, args):
+        getattr(self, self.COMMANDS[op])(*args)
+
+# 只影响显示、不影响玩法的字段不计入哈希 (剧情日志在界面渲染时追加、墙钟时间、界面语言)
+HASH_EXCLUDED = ("story_log", "last_update", "language")
+# 守护程序创建时复制了当前语言的名称；切换语言不会被录制，名称也不计入哈希
+HASH_EXCLUDED_DAEMON_FIELDS = ("name",)
+
+def state_hash(state):
+    """游戏状态的摘要 (16 位十六进制)"""
+    data = state.to_dict()
+    for field in HASH_EXCLUDED:
+        data.pop(field, None)
+    data["daemons"] = [{key: value for key, value in daemon.items() if key not in HASH_EXCLUDED_DAEMON_FIELDS}
+                       for daemon in data["daemons"]]
+    text = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+class InputRecorder:
+    """
+    录制一段会话：创建时记下起始存档 (默认为当前状态的快照)，之后由 GameSession 调用 tick / command。
+    指令为 [tick 序号, 指令名, 参数...]，tick 序号表示该指令发生在第几个 tick 之前。
+    """
+
+    def __init__(self, state, start=None):
+        self.seed = state.seed
+        self.start = json.loads(json.dumps(start if start is not None else state.to_dict()))
+        self.ticks = []    # 每个 tick 的间隔 (毫秒)
+        self.commands = []
+
+    def tick(self, dt_ms):
+        self.ticks.append(dt_ms)
+
+    def command(self, op, *args):
+        self.commands.append([len(self.ticks), op, *args])
+
+    def to_data(self, state):
+        return {
+            "version": REPLAY_VERSION,
+            "seed": self.seed,
+            "start": self.start,
+            "ticks": self.ticks,
+            "commands": self.commands,
+            "hash": state_hash(state),
+        }
+
+def dumps_replay(data):
+    return REPLAY_PREFIX + base64.b64encode(encode_save(data)).decode("ascii")
+
+def loads_replay(text):
+    text = text.strip()
+    if not text.startswith(REPLAY_PREFIX):
+        raise ValueError("无效的录像格式")
+    data = decode_save(base64.b64decode(text[len(REPLAY_PREFIX):]))
+    if data.get("version") != REPLAY_VERSION:
+        raise ValueError(f"不支持的录像版本 {data.get('version')}")
+    return data
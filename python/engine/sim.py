@@ -0,0 +1,354 @@
+"""
+无界面模拟器：在纯 CPython 下以最高速度运行脚本化的玩家策略，
+报告到达各个里程碑所需的模拟时间，用于数值平衡。
+
+用法 (在 python/ 目录下):
+    python -m engine.sim [--seed N] [--lang en] [--hours 168] [--json]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+
+from engine.state import GameState
+from engine.manager import GameManager
+from engine.dungeon import DungeonEngine, WALL, FLOOR, EXIT
+from engine.daemon import DaemonManager
+from engine.combat import CombatEngine
+from engine.quest import QuestManager
+from utils.rng import SeededRNG
+from utils.bundle import open_content
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data")
+BUNDLE_PATH = os.path.join(DATA_DIR, "bundle.bin")
+
+MOVE_SECONDS = 1 # 地牢中每一步消耗的模拟时间
+ACTION_SECONDS = 1 # 每个战斗动作消耗的模拟时间
+
+# 里程碑: 名称 -> 判定函数
+MILESTONES = {
+    "first_building": lambda sim: any(level > 0 for level in sim.state.buildings.values()),
+    "compute_500": lambda sim: sim.state.resources.get("compute", 0) >= 500,
+    "dungeon_10": lambda sim: sim.dungeon.current_level >= 10,
+}
+
+def load_definitions(lang="en", bundle_path=BUNDLE_PATH):
+    """与游戏相同，从内容包读取某种语言的全部定义，返回 { 文件名: 解析后的对象 } (每次调用都是新副本)"""
+    return open_content(lang, bundle_path).content
+
+class Simulation:
+    """组装全部引擎对象，不依赖浏览器"""
+
+    def __init__(self, seed=0, lang="en", definitions=None):
+        self.seed = seed
+        # 所有随机性都来自由 seed 派生的命名子流，不依赖全局 random，可安全地并行运行
+        self.state = GameState()
+        self.state.language = lang
+        self.rng = SeededRNG(seed)
+        self.state.seed = seed
+        self.state.attach_rng(self.rng)
+        self.manager = GameManager(self.state, self.rng)
+        self.dungeon = DungeonEngine(self.state, self.rng)
+        self.daemon_mgr = DaemonManager(self.state)
+        self.quest_mgr = QuestManager(self.state)
+        self.combat = CombatEngine(self.state, self.daemon_mgr, lambda: None, self.rng, self.quest_mgr)
+
+        files = definitions or load_definitions(lang)
+        self.manager.load_definitions(files["resources"], files["events"], files["buildings"], files["artifacts"])
+        self.daemon_mgr.load_definitions(files["daemons"])
+        self.quest_mgr.load_definitions(files["quests"])
+
+        initial_daemon = self.daemon_mgr.create_daemon("vanguard", level=1)
+        if initial_daemon:
+            self.state.daemons.append(initial_daemon)
+        self.dungeon.generate_level(1)
+
+        self.time = 0 # 已模拟的秒数
+        self.reached = {}
+
+    def advance(self, seconds):
+        """用 GameManager.advance 的闭式解一次推进 seconds 秒"""
+        seconds = int(seconds)
+        if seconds <= 0: return
+        self.manager.advance(seconds)
+        self.time += seconds
+
+    def check_milestones(self):
+        for name, reached in MILESTONES.items():
+            if name not in self.reached and reached(self):
+                self.reached[name] = self.time
+
+    def time_to_afford(self, costs):
+        """按当前净产出，资源攒够 costs 还需多少秒 (无法攒够返回 inf)"""
+        rates = self.manager.net_rates()
+        wait = 0
+        for res, amount in costs.items():
+            have = self.state.resources.get(res, 0)
+            if have >= amount: continue
+            rate = rates.get(res, 0)
+            if rate <= 0 or amount > self.state.storage_caps.get(res, math.inf):
+                return math.inf
+            wait = max(wait, (amount - have) / rate)
+        return wait
+
+    # --- 地牢 ---
+
+    def path_to_target(self):
+        """BFS 找到最近的符号格子 (出口 E 最后考虑)，返回沿途每一步的方向"""
+        dungeon = self.dungeon
+        grid, width = dungeon.grid, dungeon.width
+        start = dungeon.index(*dungeon.player_pos)
+        # 边界一圈都是墙，从可走格子出发的一步不会越出缓冲区
+        moves = ((width, (0, 1)), (-width, (0, -1)), (1, (1, 0)), (-1, (-1, 0)))
+        parents = {start: None}
+        queue = deque([start])
+        target = None
+        exit_pos = None
+        while queue:
+            pos = queue.popleft()
+            tile = grid[pos]
+            if pos != start and tile != FLOOR:
+                if tile != EXIT:
+                    target = pos
+                    break
+                if exit_pos is None:
+                    exit_pos = pos
+            for offset, _ in moves:
+                nxt = pos + offset
+                if nxt not in parents and grid[nxt] != WALL:
+                    parents[nxt] = pos
+                    queue.append(nxt)
+        target = target if target is not None else exit_pos
+        if target is None:
+            return None
+
+        direction = {offset: step for offset, step in moves}
+        steps = []
+        while parents[target] is not None:
+            prev = parents[target]
+            steps.append(direction[target - prev])
+            target = prev
+        steps.reverse()
+        return steps
+
+    def fight(self):
+        """简单战斗策略：带宽够就攻击，否则重置"""
+        elapsed = 0
+        while self.combat.is_active:
+            action = "attack" if self.combat.player_bw >= 20 else "reset"
+            self.combat.execute_player_action(action)
+            elapsed += ACTION_SECONDS
+        return elapsed
+
+    def run_dungeon_level(self, descend=True):
+        """清空当前地牢层并离开 (descend=False 时重新生成同一层用于刷资源)，返回消耗的模拟秒数"""
+        elapsed = 0
+        level = self.dungeon.current_level
+        next_level = level + 1 if descend else level
+        while True:
+            steps = self.path_to_target()
+            if steps is None:
+                break
+            for step in steps:
+                result, _ = self.dungeon.move_player(*step)
+                elapsed += MOVE_SECONDS
+            self.dungeon.apply_rewards(result)
+            if result == "ENEMY":
+                self.combat.start_combat("SECURITY_NODE", level)
+                elapsed += self.fight()
+            elif result == "EXIT":
+                break
+        self.dungeon.generate_level(next_level)
+        return elapsed
+
+    def farm(self, runs, seconds_per_run, yields):
+        """
+        宏步刷地牢：按已采样的单层平均耗时与收益，一次结算 runs 层。
+        被动产出照常用闭式解推进，刷图收益在结束时一次性计入并受存储上限约束。
+        """
+        self.advance(runs * seconds_per_run)
+        for res, amount in yields.items():
+            self.state.resources[res] = self.state.resources.get(res, 0) + amount * runs
+        self.manager.apply_storage_caps()
+
+class GreedyPolicy:
+    """
+    贪心策略：能买就买最便宜的建筑 (跳过会消耗算力的建筑)，能量攒满时换成算力。
+    地牢未到目标层数时逐层下潜；之后若没有任何建筑能靠产出攒够，
+    就在目标层刷资源：先真实运行 farm_samples 层采样平均收益，再按样本宏步结算。
+    否则直接跳到下一个决策时刻。
+    """
+
+    def __init__(self, dungeon_target=10, max_wait=3600, avoid_consuming=("compute",), farm_samples=8):
+        self.dungeon_target = dungeon_target
+        self.max_wait = max_wait
+        self.avoid_consuming = avoid_consuming
+        self.farm_samples = farm_samples
+        self.samples = [] # [(seconds, { res: 收益 }), ...]
+        self.profile = None
+
+    def candidates(self, sim):
+        """按单级总成本从低到高排序的可建造建筑"""
+        manager = sim.manager
+        result = []
+        for b_id, b_def in manager.building_defs.items():
+            consumes = b_def.get("effects", {}).get("consume", {})
+            if any(res in consumes for res in self.avoid_consuming): continue
+            if "requires_artifact" in b_def and b_def["requires_artifact"] not in sim.state.artifacts: continue
+            result.append((sum(manager.building_cost(b_id).values()), b_id))
+        result.sort()
+        return [b_id for _, b_id in result]
+
+    def buy(self, sim):
+        """
+        反复购买排序最靠前的买得起的建筑。每次连续买多级，直到它的单级成本超过排在它后面的建筑
+        (之后排序才可能变化)，结果与逐级购买并重新排序相同，但批次数与购买的级数无关。
+        返回购买结束后的候选排序。
+        """
+        manager = sim.manager
+        while True:
+            ranked = self.candidates(sim)
+            for i, b_id in enumerate(ranked):
+                if not manager.can_afford(manager.building_cost(b_id)): continue
+                count = manager.max_affordable(b_id)
+                if i + 1 < len(ranked):
+                    count = min(count, self.levels_until(manager, b_id, sum(manager.building_cost(ranked[i + 1]).values())))
+                manager.build(b_id, max(1, count))
+                break
+            else:
+                return ranked
+
+    def levels_until(self, manager, b_id, limit):
+        """从当前等级起，单级总成本不超过 limit 的连续级数 (倍率为 1 时不受限)"""
+        unit = sum(manager.building_cost(b_id).values())
+        multiplier = manager.cost_multiplier(b_id)
+        if multiplier == 1 or unit <= 0:
+            return math.inf
+        if unit > limit:
+            return 1
+        return int(math.log(limit / unit) / math.log(multiplier)) + 1
+
+    def convert_energy(self, sim):
+        """对应剧情动作 gather_compute：消耗 50 能量换取 5 算力"""
+        res = sim.state.resources
+        cap = sim.state.storage_caps.get("compute", math.inf)
+        while res.get("energy", 0) >= 50 and res.get("compute", 0) + 5 <= cap:
+            res["energy"] -= 50
+            res["compute"] = res.get("compute", 0) + 5
+
+    def sample_farm_run(self, sim):
+        """真实运行一层地牢并记录纯刷图收益"""
+        before = dict(sim.state.resources)
+        seconds = sim.run_dungeon_level(descend=False)
+        gains = {res: amount - before.get(res, 0) for res, amount in sim.state.resources.items()}
+        self.samples.append((max(1, seconds), gains))
+        sim.advance(seconds)
+
+    def farm_profile(self):
+        """采样完成后的单层平均耗时与收益 (样本不再变化，只计算一次)"""
+        if self.profile is None:
+            seconds = sum(t for t, _ in self.samples) / len(self.samples)
+            yields = {}
+            for _, gains in self.samples:
+                for res, amount in gains.items():
+                    yields[res] = yields.get(res, 0) + amount / len(self.samples)
+            self.profile = (seconds, yields)
+        return self.profile
+
+    def farm_runs_needed(self, sim, costs, yields):
+        """刷多少层才能攒够 costs (不计被动产出；攒不够返回 inf)"""
+        runs = 0
+        for res, amount in costs.items():
+            deficit = amount - sim.state.resources.get(res, 0)
+            if deficit <= 0: continue
+            if yields.get(res, 0) <= 0 or amount > sim.state.storage_caps.get(res, math.inf):
+                return math.inf
+            runs = max(runs, math.ceil(deficit / yields[res]))
+        return runs
+
+    def step(self, sim):
+        candidates = self.buy(sim)
+
+        # 能量攒满 (或刚够一次兑换) 时才兑换，避免每 50 能量就产生一个决策点
+        energy_cap = sim.state.storage_caps.get("energy", math.inf)
+        energy_target = max(50, energy_cap)
+        if sim.state.resources.get("energy", 0) >= energy_target:
+            self.convert_energy(sim)
+
+        if sim.dungeon.current_level < self.dungeon_target:
+            sim.advance(sim.run_dungeon_level())
+            return
+
+        # 下一个目标：靠当前产出最快能攒够的建筑
+        waits = [sim.time_to_afford(sim.manager.building_cost(b_id)) for b_id in candidates]
+        wait = min(waits) if waits else math.inf
+
+        if wait == math.inf:
+            if len(self.samples) < self.farm_samples:
+                self.sample_farm_run(sim)
+                return
+            seconds, yields = self.farm_profile()
+            runs = min((self.farm_runs_needed(sim, sim.manager.building_cost(b_id), yields) for b_id in candidates), default=math.inf)
+            if runs != math.inf:
+                sim.farm(max(1, runs), seconds, yields)
+                return
+
+        if sim.state.resources.get("compute", 0) + 5 <= sim.state.storage_caps.get("compute", math.inf):
+            wait = min(wait, sim.time_to_afford({"energy": energy_target}))
+        sim.advance(max(1, math.ceil(min(wait, self.max_wait))))
+
+def run(seed=0, lang="en", hours=168, policy=None, definitions=None):
+    """
+    运行一次模拟，返回紧凑的摘要 (可直接序列化为 JSON)。
+    模拟通过 advance 的解析宏步与刷图外推推进，不逐个执行 tick()；
+    sim_seconds_per_wall_second 是每秒墙钟时间推进的模拟秒数，不是 tick 吞吐量。
+    """
+    policy = policy or GreedyPolicy()
+    sim = Simulation(seed=seed, lang=lang, definitions=definitions)
+    horizon = int(hours * 3600)
+    start = time.perf_counter()
+    while sim.time < horizon and len(sim.reached) < len(MILESTONES):
+        policy.step(sim)
+        sim.check_milestones()
+    wall = time.perf_counter() - start
+    return {
+        "seed": seed,
+        "sim_seconds": sim.time,
+        "wall_seconds": wall,
+        "sim_seconds_per_wall_second": sim.time / wall if wall > 0 else math.inf,
+        "milestones": {name: sim.reached.get(name) for name in MILESTONES},
+        "buildings": dict(sim.state.buildings),
+        "dungeon_level": sim.dungeon.current_level,
+    }
+
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    hours, rem = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rem, 60)
+    return f"{hours}h{minutes:02d}m{secs:02d}s"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cyber-Idle 无界面里程碑模拟器")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--hours", type=float, default=168, help="最长模拟时长 (小时)")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出摘要")
+    args = parser.parse_args(argv)
+
+    summary = run(seed=args.seed, lang=args.lang, hours=args.hours)
+    if args.json:
+        print(json.dumps(summary))
+        return
+
+    print(f"seed={summary['seed']} dungeon_level={summary['dungeon_level']}")
+    for name, reached in summary["milestones"].items():
+        print(f"  {name:<16} {format_duration(reached)}")
+    print(f"simulated {summary['sim_seconds']}s of game time in {summary['wall_seconds']:.3f}s wall "
+          f"({summary['sim_seconds_per_wall_second'] / 1e6:.1f}M sim-s/s, analytic macro-steps; tick() not executed)")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,81 @@
+"""
+技能表编译与效果分发。
+
+daemons.json 中主动技能通过 "effects" 声明效果，例如:
+    "effects": [{"type": "damage", "power": 5.0}, {"type": "set_bandwidth", "value": 0}]
+载入时每个职业的 skill_tree 被编译成按 ID 索引的表，前置链预先展开，
+效果被编译成 (处理函数, 参数) 列表；战斗中释放技能只需一次字典查找。
+新增效果类型用 @effect 注册处理函数，新增技能只需修改数据。
+"""
+
+EFFECT_HANDLERS = {} # { 效果类型: handler(combat, daemon, params) -> 造成的伤害 }
+
+def effect(effect_type):
+    """装饰器：注册一种技能效果"""
+    def register(handler):
+        EFFECT_HANDLERS[effect_type] = handler
+        return handler
+    return register
+
+@effect("damage")
+def apply_damage(combat, daemon, params):
+    damage = daemon["stats"]["intrusion"] * params.get("power", 1.0)
+    combat.enemy_hp -= damage
+    return damage
+
+@effect("set_bandwidth")
+def apply_set_bandwidth(combat, daemon, params):
+    combat.player_bw = params.get("value", 0)
+    return 0
+
+class SkillTable:
+    """
+    一个职业编译后的技能表。
+    skills  - { skill_id: 技能定义 } (引用原定义，切换语言后名称随之更新)
+    chains  - { skill_id: (直接前置, 前置的前置, ...) }
+    effects - { skill_id: [(handler, params), ...] }
+    """
+
+    def __init__(self, daemon_id, skill_tree):
+        self.skills = {skill["id"]: skill for skill in skill_tree}
+        self.chains = {}
+        self.effects = {}
+        for skill_id, skill in self.skills.items():
+            self.chains[skill_id] = self._resolve_chain(daemon_id, skill_id)
+            self.effects[skill_id] = self._compile_effects(daemon_id, skill)
+
+    def _resolve_chain(self, daemon_id, skill_id):
+        chain = []
+        req = self.skills[skill_id].get("req")
+        while req:
+            if req not in self.skills:
+                raise ValueError(f"{daemon_id}.{skill_id}: 前置技能 {req} 不存在")
+            if req in chain or req == skill_id:
+                raise ValueError(f"{daemon_id}.{skill_id}: 前置技能存在循环")
+            chain.append(req)
+            req = self.skills[req].get("req")
+        return tuple(chain)
+
+    def _compile_effects(self, daemon_id, skill):
+        compiled = []
+        for params in skill.get("effects", []):
+            handler = EFFECT_HANDLERS.get(params.get("type"))
+            if handler is None:
+                raise ValueError(f"{daemon_id}.{skill['id']}: 未知的技能效果 {params.get('type')}")
+            compiled.append((handler, params))
+        return compiled
+
+    def get(self, skill_id):
+        return self.skills.get(skill_id)
+
+    def missing_prereqs(self, skill_id, learned):
+        """返回尚未学习的前置技能 (由近及远)"""
+        return [req for req in self.chains.get(skill_id, ()) if req not in learned]
+
+    def cast(self, skill_id, combat, daemon):
+        """依次执行技能的全部效果，返回造成的总伤害"""
+        return sum(handler(combat, daemon, params) for handler, params in self.effects[skill_id])
+
+def compile_skill_tables(definitions):
+    """{ daemon_id: SkillTable }"""
+    return {daemon_id: SkillTable(daemon_id, defn.get("skill_tree", [])) for daemon_id, defn in definitions.items()}
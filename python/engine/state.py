@@ -1,9 +1,175 @@
 import json
 
+from engine.log import StoryLog
+
+_MISSING = object()
+
+class TrackedDict(dict):
+    """写入时通知 GameState 的字典，值未变化的写入不记为变更"""
+
+    def __init__(self, owner, field, data=()):
+        dict.__init__(self, data)
+        self._owner = owner
+        self._field = field
+
+    def __setitem__(self, key, value):
+        if dict.get(self, key, _MISSING) == value: return
+        dict.__setitem__(self, key, value)
+        self._owner.touch(self._field, key)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._owner.touch(self._field, key)
+
+    def __reduce__(self):
+        # 复制 / pickle 时退化为普通字典，由 GameState.__setstate__ 重新包装
+        return (dict, (dict(self),))
+
+    def pop(self, key, *default):
+        if key in self:
+            self._owner.touch(self._field, key)
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._owner.touch(self._field, key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        """批量写入，所有键共用一个版本号 (不逐项比较旧值，调用方应只传入变化的项)"""
+        items = dict(*args, **kwargs)
+        if not items: return
+        dict.update(self, items)
+        self._owner.touch(self._field, *items)
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
+
+class TrackedList(list):
+    """增删或替换元素时通知 GameState 的列表；元素内部的修改需调用 state.touch"""
+
+    def __init__(self, owner, field, data=()):
+        list.__init__(self, data)
+        self._owner = owner
+        self._field = field
+
+    def _mutator(name):
+        method = getattr(list, name)
+        def wrapper(self, *args):
+            result = method(self, *args)
+            self._owner.touch(self._field)
+            return result
+        wrapper.__name__ = name
+        return wrapper
+
+    append = _mutator("append")
+    extend = _mutator("extend")
+    insert = _mutator("insert")
+    pop = _mutator("pop")
+    remove = _mutator("remove")
+    clear = _mutator("clear")
+    reverse = _mutator("reverse")
+    __setitem__ = _mutator("__setitem__")
+    __delitem__ = _mutator("__delitem__")
+    __iadd__ = _mutator("__iadd__")
+    del _mutator
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self._owner.touch(self._field)
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+class TrackedField:
+    """
+    GameState 顶层字段的描述符：赋值时包装为 TrackedDict / TrackedList 并记录版本。
+    只定义 __set__，读取直接命中实例 __dict__，不增加读开销。
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    @staticmethod
+    def wrap(state, name, value):
+        if isinstance(value, dict):
+            return TrackedDict(state, name, value)
+        if isinstance(value, list):
+            return TrackedList(state, name, value)
+        return value
+
+    def __set__(self, state, value):
+        name = self.name
+        if not isinstance(value, (dict, list)) and state.__dict__.get(name, _MISSING) == value:
+            return
+        value = self.wrap(state, name, value)
+        state.__dict__[name] = value
+        state.touch(name)
+        if isinstance(value, dict):
+            state.replaced[name] = state.version
+            state.key_versions[name] = {}
+
 class GameState:
+    resources = TrackedField()
+    buildings = TrackedField()
+    daemons = TrackedField()
+    active_daemon_index = TrackedField()
+    active_quests = TrackedField()
+    artifacts = TrackedField()
+    current_story_node = TrackedField()
+
     def __init__(self):
+        # 全局单调递增的版本号；观察者记下读取时的 version，之后用 changed_since 查询变化
+        self.version = 0
+        self.field_versions = {} # { 字段名: 最后变化时的版本 }
+        self.key_versions = {}   # { 字段名: { 键: 最后变化时的版本 } } (resources / buildings)
+        self.replaced = {}       # { 字段名: 整体赋值时的版本 }
+        self.rng = None          # 绑定的 SeededRNG：存档时记录各随机流的位置，读档时恢复
         self.reset()
 
+    def __setstate__(self, data):
+        """
+        copy / pickle 的还原：跟踪字段重新包装并绑定到新对象，版本号原样保留。
+        版本记录复制一份 (浅拷贝时 data 与原对象共享这些字典)，副本上的修改不会影响原对象。
+        """
+        self.__dict__.update(data)
+        self.field_versions = dict(data["field_versions"])
+        self.key_versions = {field: dict(keys) for field, keys in data["key_versions"].items()}
+        self.replaced = dict(data["replaced"])
+        for name, field in vars(GameState).items():
+            if isinstance(field, TrackedField) and name in data:
+                self.__dict__[name] = TrackedField.wrap(self, name, data[name])
+
+    def attach_rng(self, rng):
+        self.rng = rng
+
+    def touch(self, field, *keys):
+        """记录一次变化；修改守护程序、任务等列表元素的内部字段后需手动调用"""
+        self.version += 1
+        self.field_versions[field] = self.version
+        if keys:
+            self.key_versions[field].update(dict.fromkeys(keys, self.version))
+
+    def changed_since(self, version):
+        """返回在 version 之后发生过变化的字段集合"""
+        if version >= self.version:
+            return set()
+        return {field for field, v in self.field_versions.items() if v > version}
+
+    def keys_changed_since(self, field, version):
+        """返回字典字段 (resources / buildings) 中在 version 之后变化过的键"""
+        if self.field_versions.get(field, 0) <= version:
+            return set()
+        if self.replaced.get(field, 0) > version:
+            return set(getattr(self, field)) | set(self.key_versions[field])
+        return {key for key, v in self.key_versions[field].items() if v > version}
+
     def reset(self):
         self.resources = {
             "energy": 100,
@@ -24,8 +190,10 @@ class GameState:
         self.active_daemon_index = 0 # 当前选中的守护程序索引
         self.active_quests = [] # 存储当前接受的任务
         self.story_flags = []
+        self.story_log = StoryLog() # 有界的剧情日志
         self.current_story_node = "start"
         self.seed = None
+        self.rng_positions = {} # { 随机流名: 已抽取次数 }
         self.tick_count = 0
         self.last_update = 0
         self.unlocked_actions = ["gather_energy"]
@@ -38,7 +206,10 @@ class GameState:
         return math.floor(math.sqrt(self.resources.get("hacking_xp", 0) / 100)) + 1
 
     def to_json(self):
-        return json.dumps({
+        return json.dumps(self.to_dict())
+
+    def to_dict(self):
+        return {
             "resources": self.resources,
             "storage_caps": self.storage_caps,
             "buildings": self.buildings,
@@ -47,16 +218,20 @@ class GameState:
             "active_daemon_index": self.active_daemon_index,
             "active_quests": self.active_quests,
             "story_flags": self.story_flags,
+            "story_log": self.story_log.to_data(),
             "current_story_node": self.current_story_node,
             "seed": self.seed,
+            "rng_positions": self.rng.positions() if self.rng else self.rng_positions,
             "tick_count": self.tick_count,
             "last_update": self.last_update,
             "unlocked_actions": self.unlocked_actions,
             "language": self.language
-        })
+        }
 
     def from_json(self, json_str):
-        data = json.loads(json_str)
+        self.from_dict(json.loads(json_str))
+
+    def from_dict(self, data):
         self.resources = data.get("resources", self.resources)
         self.storage_caps = data.get("storage_caps", self.storage_caps)
         self.buildings = data.get("buildings", {})
@@ -65,8 +240,13 @@ class GameState:
         self.active_daemon_index = data.get("active_daemon_index", 0)
         self.active_quests = data.get("active_quests", [])
         self.story_flags = data.get("story_flags", self.story_flags)
+        self.story_log.load_data(data.get("story_log", []))
         self.current_story_node = data.get("current_story_node", self.current_story_node)
         self.seed = data.get("seed", self.seed)
+        self.rng_positions = data.get("rng_positions", {})
+        if self.rng is not None and self.seed is not None:
+            self.rng.reseed(self.seed)
+            self.rng.restore(self.rng_positions)
         self.tick_count = data.get("tick_count", self.tick_count)
         self.last_update = data.get("last_update", self.last_update)
         self.unlocked_actions = data.get("unlocked_actions", self.unlocked_actions)
@@ -1,12 +1,15 @@
-import json
+from utils.bundle import parse_data
+from engine.triggers import StoryTriggers
 
 class StoryManager:
     def __init__(self, state):
         self.state = state
         self.story_nodes = {}
+        self.triggers = StoryTriggers()
 
     def load_nodes(self, json_data):
-        self.story_nodes = json.loads(json_data)
+        self.story_nodes = parse_data(json_data)
+        self.triggers.compile(self.story_nodes)
 
     def get_current_node(self):
         node_id = self.state.current_story_node
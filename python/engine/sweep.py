@@ -0,0 +1,105 @@
+"""
+经济参数扫描：对 buildings.json / resources.json 的一组变体并行运行无界面模拟，
+每次运行只回传紧凑摘要，输出每个变体的里程碑时间表 (CSV 或 JSON)。
+
+用法 (在 python/ 目录下):
+    python -m engine.sweep --cost 0.8 1 1.2 --gen 0.5 1 2 --seeds 0 1 2 --out sweep.csv
+"""
+import argparse
+import copy
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import sim
+
+_base_files = None # 每个工作进程只读取一次基础定义 (内容包)
+
+def _init_worker(lang):
+    global _base_files
+    _base_files = sim.load_definitions(lang)
+
+def scale_definitions(files, cost_factor=1.0, gen_factor=1.0):
+    """
+    返回缩放后的定义副本 (深拷贝，同一工作进程中的各次运行互不影响)。
+    cost_factor 缩放 cost_multiplier 超出 1 的增长部分 (1.5 -> 1 + 0.5 * factor)，
+    保证倍率不会低于 1；gen_factor 缩放资源与建筑的 auto_gen 速率。
+    """
+    scaled = copy.deepcopy(files)
+    resources = scaled["resources"]
+    for res_def in resources.values():
+        if "auto_gen" in res_def:
+            res_def["auto_gen"] *= gen_factor
+
+    buildings = scaled["buildings"]
+    for category in buildings.values():
+        for b_def in category.values():
+            multiplier = b_def.get("cost_multiplier", 1.5)
+            b_def["cost_multiplier"] = max(1, 1 + (multiplier - 1) * cost_factor)
+            auto_gen = b_def.get("effects", {}).get("auto_gen", {})
+            for res in auto_gen:
+                auto_gen[res] *= gen_factor
+
+    return scaled
+
+def run_variant(task):
+    """工作进程入口：运行一个 (变体, 种子) 组合，只返回扁平的摘要行"""
+    cost_factor, gen_factor, seed, hours = task
+    files = scale_definitions(_base_files, cost_factor, gen_factor)
+    summary = sim.run(seed=seed, hours=hours, definitions=files)
+    row = {
+        "cost_factor": cost_factor,
+        "gen_factor": gen_factor,
+        "seed": seed,
+        "sim_seconds": summary["sim_seconds"],
+        "wall_seconds": round(summary["wall_seconds"], 4),
+    }
+    for name, reached in summary["milestones"].items():
+        row[name] = reached
+    return row
+
+def sweep(cost_factors, gen_factors, seeds, hours=168, lang="en", workers=None):
+    """并行运行全部组合，按提交顺序返回摘要行"""
+    tasks = list(itertools.product(cost_factors, gen_factors, seeds, [hours]))
+    chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(lang,)) as pool:
+        return list(pool.map(run_variant, tasks, chunksize=chunksize))
+
+def write_table(rows, path):
+    """按扩展名写出 CSV 或 JSON；path 为 None 时以 CSV 打印到标准输出"""
+    if path and path.endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        return
+
+    out = open(path, "w", newline="", encoding="utf-8") if path else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=list(rows[0].keys()) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if path:
+            out.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cyber-Idle 经济参数扫描")
+    parser.add_argument("--cost", type=float, nargs="+", default=[1.0], help="cost_multiplier 缩放系数")
+    parser.add_argument("--gen", type=float, nargs="+", default=[1.0], help="auto_gen 缩放系数")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--hours", type=float, default=168)
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=None, help="输出文件 (.csv 或 .json)，默认打印 CSV")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows = sweep(args.cost, args.gen, args.seeds, hours=args.hours, lang=args.lang, workers=args.workers)
+    write_table(rows, args.out)
+    print(f"{len(rows)} runs in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
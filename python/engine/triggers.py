@@ -0,0 +1,159 @@
+from bisect import bisect_right, insort
+
+class TriggerRule:
+    """
+    一条剧情触发规则，声明在 story.json 中目标节点的 "trigger" 字段:
+    {
+        "from_node": "energy_stable",      # 仅当当前处于该节点时触发 (可选)
+        "priority": 1,                     # 数字越小越优先
+        "resources": { "compute": 500 },   # 资源下限
+        "artifacts": ["project_genesis_log"],
+        "flags": ["some_flag"],            # 需要已存在的剧情标记
+        "flag": "echo_high_compute_triggered"  # 触发后写入的标记，已存在则不再触发
+    }
+    """
+
+    def __init__(self, target_node, spec, order=0):
+        self.target_node = target_node
+        self.from_node = spec.get("from_node")
+        self.priority = (spec.get("priority", 100), order)
+        self.resources = dict(spec.get("resources", {}))
+        self.artifacts = list(spec.get("artifacts", []))
+        self.flags = list(spec.get("flags", []))
+        self.flag = spec.get("flag")
+
+    def dependencies(self):
+        """规则依赖的状态键，用于订阅变化"""
+        deps = [("artifact", a) for a in self.artifacts]
+        deps += [("flag", f) for f in self.flags]
+        if self.flag:
+            deps.append(("flag", self.flag))
+        if self.from_node:
+            deps.append(("node", None))
+        return deps
+
+    def check(self, state, artifacts, flags):
+        if self.from_node and state.current_story_node != self.from_node:
+            return False
+        if self.flag and self.flag in flags:
+            return False
+        for res, amount in self.resources.items():
+            if state.resources.get(res, 0) < amount:
+                return False
+        for art in self.artifacts:
+            if art not in artifacts:
+                return False
+        for flag in self.flags:
+            if flag not in flags:
+                return False
+        return True
+
+    def fire(self, state):
+        state.current_story_node = self.target_node
+        if self.flag:
+            state.story_flags.append(self.flag)
+
+class StoryTriggers:
+    """
+    编译后的剧情触发规则集。
+    每条规则只订阅自己依赖的资源、档案、标记和当前节点；
+    poll 时只检查被订阅的键是否变化，只重新求值受影响的规则，
+    因此每 tick 的开销与规则总数无关。
+    """
+
+    def __init__(self):
+        self.rules = []
+        self.subscribers = {} # { ("artifact", id) / ("flag", id) / ("node", None): [rule, ...] }
+        self.thresholds = {}  # { res_id: [(amount, order, rule), ...] } 按阈值排序
+        self.dirty = set()
+        self.reset_watch()
+
+    def compile(self, story_nodes):
+        self.rules = []
+        self.subscribers = {}
+        self.thresholds = {}
+        for node_id, node in story_nodes.items():
+            if "trigger" not in node: continue
+            rule = TriggerRule(node_id, node["trigger"], order=len(self.rules))
+            self.rules.append(rule)
+            for dep in rule.dependencies():
+                self.subscribers.setdefault(dep, []).append(rule)
+            for res, amount in rule.resources.items():
+                insort(self.thresholds.setdefault(res, []), (amount, rule.priority[1], rule))
+        self.reset_watch()
+
+    def reset_watch(self):
+        """清空观察快照，下次 poll 时所有规则都会重新求值"""
+        self.last_node = None
+        self.last_resources = {}
+        self.artifacts_source = None
+        self.artifacts_seen = 0
+        self.artifact_set = set()
+        self.flags_source = None
+        self.flags_seen = 0
+        self.flag_set = set()
+        self.dirty = set(self.rules)
+
+    def _mark(self, key):
+        for rule in self.subscribers.get(key, ()):
+            self.dirty.add(rule)
+
+    def _watch(self, state):
+        """对比被订阅的状态键，把受影响的规则标记为待求值"""
+        if state.current_story_node != self.last_node:
+            self.last_node = state.current_story_node
+            self._mark(("node", None))
+
+        # 资源：只有跨越某个阈值时才影响规则结果
+        for res, entries in self.thresholds.items():
+            value = state.resources.get(res, 0)
+            last = self.last_resources.get(res)
+            if last == value: continue
+            self.last_resources[res] = value
+            if last is None:
+                lo, hi = 0, len(entries)
+            else:
+                low, high = min(last, value), max(last, value)
+                lo = bisect_right(entries, (low, float("inf")))
+                hi = bisect_right(entries, (high, float("inf")))
+            for _, _, rule in entries[lo:hi]:
+                self.dirty.add(rule)
+
+        # 档案与标记是只追加的列表：只处理新增部分，整体替换 (读档) 时全部重扫
+        if state.artifacts is not self.artifacts_source or len(state.artifacts) < self.artifacts_seen:
+            self.artifacts_source = state.artifacts
+            self.artifacts_seen = 0
+            self.artifact_set = set()
+            self.dirty = set(self.rules)
+        for art in state.artifacts[self.artifacts_seen:]:
+            self.artifact_set.add(art)
+            self._mark(("artifact", art))
+        self.artifacts_seen = len(state.artifacts)
+
+        if state.story_flags is not self.flags_source or len(state.story_flags) < self.flags_seen:
+            self.flags_source = state.story_flags
+            self.flags_seen = 0
+            self.flag_set = set()
+            self.dirty = set(self.rules)
+        for flag in state.story_flags[self.flags_seen:]:
+            self.flag_set.add(flag)
+            self._mark(("flag", flag))
+        self.flags_seen = len(state.story_flags)
+
+    def poll(self, state):
+        """返回当前应触发的最高优先级规则 (没有则返回 None)"""
+        self._watch(state)
+        if not self.dirty:
+            return None
+
+        best = None
+        for rule in list(self.dirty):
+            if rule.check(state, self.artifact_set, self.flag_set):
+                # 满足条件但未被选中的规则保持待求值状态
+                if best is None or rule.priority < best.priority:
+                    best = rule
+            else:
+                self.dirty.discard(rule)
+        if best is not None:
+            self.dirty.discard(best)
+        return best
@@ -1,8 +1,9 @@
 import asyncio
+import math
 import time
 import sys
 import os
-from js import document, window, localStorage
+from js import document, window
 from pyodide.ffi import create_proxy
 
 # 将当前目录添加到路径，以便导入
@@ -10,100 +11,312 @@ import os
 sys.path.append(os.getcwd())
 sys.path.append(os.path.join(os.getcwd(), "python"))
 
+# 启动计时从这里开始：此前的时间 (下载 Pyodide、初始化解释器) 计入 interpreter_ready
+from utils.perf import perf, StartupProfiler
+FIRST_PAINT_BUDGET_MS = 4000
+startup = StartupProfiler(window.performance.now, FIRST_PAINT_BUDGET_MS)
+startup.mark("interpreter_ready")
+
 from engine.state import GameState
 from engine.manager import GameManager
 from engine.story import StoryManager
-from engine.dungeon import DungeonEngine
-from engine.daemon import DaemonManager
-from engine.combat import CombatEngine
-from engine.quest import QuestManager
 from utils.rng import SeededRNG
-from utils.storage import save_to_local, load_from_local, export_save_string, import_save_string
+from utils.storage import AutoSaver, load_saved, export_save_string, import_save_string
+from engine.session import GameSession, InputRecorder, dumps_replay
+from engine.roster import new_daemon
+from utils.backends import LocalStorageBackend, open_backend
 from utils.i18n import I18nManager
+from utils.bundle import open_content
+from utils.render import KeyedList, TextPatcher, ActionRouter, RenderScheduler, LogView, set_action
+from utils.lazy import Lazy, is_loaded
 
-# 初始化全局实例
+# 初始化全局实例 (首屏需要的核心系统)
 state = GameState()
-rng = SeededRNG()
+rng = SeededRNG() # 主种子；各子系统使用由它派生的命名子流
+state.attach_rng(rng)
 manager = GameManager(state, rng)
 story = StoryManager(state)
+manager.set_story_manager(story)
 i18n = I18nManager(state)
-dungeon = DungeonEngine(state, rng)
-daemon_mgr = DaemonManager(state)
+
+# --- 按需加载的子系统 ---
+# 地牢、战斗、守护程序与任务在首次使用时才拉取模块、导入并构造
+game_content = {} # 当前语言的定义 (load_game_data 填充)，供延迟构造的子系统读取
+
+def on_subsystem_loaded(name):
+    perf.incr("lazy_loaded")
+    print(f"子系统已加载: {name}")
+
+def make_dungeon():
+    from engine.dungeon import DungeonEngine
+    engine = DungeonEngine(state, rng)
+    engine.generate_level(1)
+    return engine
+
+def make_daemon_mgr():
+    from engine.daemon import DaemonManager
+    mgr = DaemonManager(state)
+    mgr.load_definitions(game_content["daemons"])
+    return mgr
+
+def make_combat_eng():
+    from engine.combat import CombatEngine
+    return CombatEngine(state, daemon_mgr, on_combat_ui_update, rng, quest_mgr)
+
+def make_quest_mgr():
+    from engine.quest import QuestManager
+    mgr = QuestManager(state)
+    mgr.load_definitions(game_content["quests"])
+    return mgr
 
 def on_combat_ui_update():
     update_ui()
 
-combat_eng = CombatEngine(state, daemon_mgr, on_combat_ui_update)
-quest_mgr = QuestManager(state)
+dungeon = Lazy("dungeon", make_dungeon, ["python/engine/dungeon.py"], on_subsystem_loaded)
+daemon_mgr = Lazy("daemon", make_daemon_mgr, ["python/engine/skills.py", "python/engine/daemon.py"], on_subsystem_loaded)
+combat_eng = Lazy("combat", make_combat_eng, ["python/engine/combat.py"], on_subsystem_loaded)
+quest_mgr = Lazy("quest", make_quest_mgr, ["python/engine/quest.py"], on_subsystem_loaded)
+
+# 玩家输入统一经由 session 执行 (与无头回放同一套逻辑)，并被录制下来 (见 export_replay)
+session = GameSession(state, manager, story, dungeon, daemon_mgr, combat_eng, quest_mgr)
+
+startup.mark("imports")
+
+localized = None # LocalizedContent：定义只装载一次，语言切换只替换字符串层
 
 async def load_game_data():
-    """加载 JSON 配置文件"""
+    """
+    首次调用时读取预编译的内容包 (一次 fetch) 并装载全部定义；
+    之后 (切换语言、导入存档) 只原地切换字符串层，引擎持有的定义对象与缓存保持不变。
+    """
+    global localized
     lang = state.language
     try:
-        # 加载公共 UI 翻译
-        with open("data/ui.json", "r", encoding="utf-8") as f:
-            ui_data = f.read()
-        i18n.load_ui_translations(ui_data)
-
-        # 加载特定语言的游戏内容
-        with open(f"data/{lang}/resources.json", "r", encoding="utf-8") as f:
-            res_data = f.read()
-        with open(f"data/{lang}/events.json", "r", encoding="utf-8") as f:
-            evt_data = f.read()
-        with open(f"data/{lang}/story.json", "r", encoding="utf-8") as f:
-            story_data = f.read()
-        
-        # 加载特定语言的守护程序定义
-        with open(f"data/{lang}/daemons.json", "r", encoding="utf-8") as f:
-            daemon_data = f.read()
-        
-        # 加载特定语言的任务定义
-        with open(f"data/{lang}/quests.json", "r", encoding="utf-8") as f:
-            quest_data = f.read()
-            
-        manager.load_definitions(res_data, evt_data)
-        story.load_nodes(story_data)
-        daemon_mgr.load_definitions(daemon_data)
-        quest_mgr.load_definitions(quest_data)
+        if localized is not None:
+            localized.switch(lang)
+            return
+        localized = open_content(lang)
+        content = localized.content
+        game_content.update(content)
+        i18n.load_ui_translations(localized.ui)
+        manager.load_definitions(content["resources"], content["events"], content["buildings"], content["artifacts"])
+        story.load_nodes(content["story"])
+        # 守护程序与任务子系统在构造时读取 game_content
     except Exception as e:
         print(f"配置文件加载失败 ({lang}): {e}")
 
+# --- 保留模式渲染 ---
+# 每个面板按 key 保留子节点，每次更新只写入发生变化的文本/样式
+
+text_patch = TextPatcher(document)
+panels = {}
+
+# 所有点击都通过每个面板上唯一的委托代理分发，存活代理数量保持恒定
+router = ActionRouter(create_proxy, perf)
+
+# 模拟 tick 与重绘解耦：任意次 update_ui 请求在每个动画帧内最多执行一次重绘
+scheduler = RenderScheduler(window, lambda: render_ui(), router.make_proxy, perf)
+
+# 剧情日志：模型是 state.story_log 环形缓冲区，DOM 中只保留可见窗口
+log_view = LogView(document, document.getElementById("story-log"), lambda: state.story_log, router.make_proxy)
+combat_log_view = LogView(document, document.getElementById("combat-log-area"), lambda: combat_eng.log,
+                          router.make_proxy, window_size=50, entry_class="combat-entry", prefix="")
+
+def create_element(tag, class_name=None, parent=None):
+    el = document.createElement(tag)
+    if class_name:
+        el.className = class_name
+    if parent is not None:
+        parent.appendChild(el)
+    return el
+
+def get_panel(container_id, factory, empty_key=None):
+    """按容器 ID 获取 (首次使用时创建) KeyedList 面板"""
+    panel = panels.get(container_id)
+    if panel is None:
+        container = document.getElementById(container_id)
+        if not container: return None
+        container.innerHTML = ""
+        router.bind(container)
+        empty_text = (lambda: i18n.get(empty_key)) if empty_key else None
+        panel = KeyedList(document, container, factory, empty_text)
+        panels[container_id] = panel
+    return panel
+
+def make_resource_node(res_id):
+    item = create_element("div", "resource-item")
+    name = create_element("span", parent=item)
+    item.appendChild(document.createTextNode(" "))
+    value = create_element("span", parent=item)
+    return item, {"name": (name, "text"), "value": (value, "text"), "title": (item, "title")}
+
+def make_daemon_node(idx):
+    item = create_element("div", "daemon-item")
+    header = create_element("div", "daemon-header", item)
+    name = create_element("span", "daemon-name", header)
+    level = create_element("span", "daemon-level", header)
+    bar = create_element("div", "daemon-xp-bar", item)
+    fill = create_element("div", "daemon-xp-fill", bar)
+    stats = create_element("div", "daemon-stats", item)
+    # 点击切换
+    set_action(item, "switch_daemon", idx)
+
+    # 添加“重构”按钮 (委托分发只命中最近的 data-action，不会再触发切换)
+    refactor_btn = create_element("button", "refactor-btn-mini", item)
+    set_action(refactor_btn, "refactor", idx)
+
+    return item, {
+        "class": (item, "class"),
+        "name": (name, "text"),
+        "level": (level, "text"),
+        "xp": (fill, "style.width"),
+        "stats": (stats, "text"),
+        "refactor": (refactor_btn, "text"),
+    }
+
+def make_quest_node(quest_id):
+    item = create_element("div", "quest-item")
+    header = create_element("div", "quest-header", item)
+    name = create_element("span", parent=header)
+    progress = create_element("span", parent=header)
+    desc = create_element("div", "quest-desc", item)
+    bar = create_element("div", "quest-progress-bar", item)
+    fill = create_element("div", "quest-progress-fill", bar)
+
+    btn = create_element("button", "quest-reward-btn", item)
+    set_action(btn, "claim_quest", quest_id)
+
+    return item, {
+        "class": (item, "class"),
+        "name": (name, "text"),
+        "progress": (progress, "text"),
+        "desc": (desc, "text"),
+        "fill": (fill, "style.width"),
+        "claim": (btn, "text"),
+        "claim_display": (btn, "style.display"),
+    }
+
+def make_combat_action_node(action_id):
+    btn = create_element("button")
+    set_action(btn, "combat", action_id)
+    return btn, {"label": (btn, "text")}
+
+def render_dungeon():
+    """地牢每行对应一个节点，只改写 render_diff 报告的行"""
+    grid = document.getElementById("dungeon-grid")
+    if len(dungeon_lines) != dungeon.height:
+        grid.innerHTML = ""
+        dungeon_lines.clear()
+        for _ in range(dungeon.height):
+            dungeon_lines.append(create_element("div", "dungeon-line", grid))
+    for y, row in dungeon.render_diff():
+        dungeon_lines[y].innerText = row
+
+dungeon_lines = []
+
+# --- 委托点击路由 (data-action -> 处理函数) ---
+
+@router.route("switch_daemon")
+def on_switch_daemon(el, event):
+    session.switch_daemon(int(el.getAttribute("data-arg")))
+    update_ui()
+
+@router.route("refactor")
+def on_refactor(el, event):
+    show_refactor_ui(int(el.getAttribute("data-arg")))
+
+@router.route("claim_quest")
+def on_claim_quest(el, event):
+    success, rewards = session.claim_quest(el.getAttribute("data-arg"))
+    if success:
+        # 显示奖励消息
+        reward_msg = ", ".join([f"+{v} {k}" for k, v in rewards.items()])
+        append_log(f"任务完成！获得奖励: {reward_msg}")
+        update_ui()
+
+@router.route("combat")
+def on_combat_action(el, event):
+    session.combat_action(el.getAttribute("data-arg"))
+    update_ui()
+
+@router.route("story_choice")
+def on_story_choice(el, event):
+    if session.story_choice(el.getAttribute("data-node"), el.getAttribute("data-arg")):
+        update_ui()
+
+def build_building(b_id, count):
+    success, msg = session.build(b_id, count)
+    if success:
+        if hasattr(window, 'npc_mgr'):
+            window.npc_mgr.check_reaction("build_complete")
+        update_ui()
+    else:
+        window.alert(msg)
+
+@router.route("build")
+def on_build(el, event):
+    build_building(el.getAttribute("data-arg"), 1)
+
+@router.route("build_max")
+def on_build_max(el, event):
+    b_id = el.getAttribute("data-arg")
+    build_building(b_id, manager.max_affordable(b_id))
+
+@router.route("toggle_artifact")
+def on_toggle_artifact(el, event):
+    el.classList.toggle("expanded")
+
+@router.route("learn_skill")
+def on_learn_skill(el, event):
+    success, msg = session.learn_skill(state.current_refactor_idx, el.getAttribute("data-arg"))
+    if success:
+        show_refactor_ui(state.current_refactor_idx)
+        update_ui()
+    else:
+        window.alert(msg)
+
 def update_ui():
+    """请求重绘：标记界面为脏，由调度器在下一帧合并执行一次 render_ui"""
+    scheduler.request()
+
+def render_ui():
     """更新页面元素"""
     # 更新静态 UI 文本
-    document.getElementById("btn-lang").innerText = i18n.get("switch_lang")
-    document.getElementById("btn-export").innerText = i18n.get("export_save")
-    document.getElementById("btn-import").innerText = i18n.get("import_save")
-    document.querySelector("#resource-panel h2").innerText = i18n.get("core_assets")
-    document.querySelector("#action-panel h2").innerText = i18n.get("system_ops")
-    document.querySelector("#quest-panel h2").innerText = i18n.get("active_contracts")
-    document.getElementById("status-text").innerText = i18n.get("status_ready")
-    document.getElementById("version").innerText = f"{i18n.get('ver_prefix')} v0.1.0-ALPHA"
+    text_patch.set("#btn-lang", i18n.get("switch_lang"))
+    text_patch.set("#btn-export", i18n.get("export_save"))
+    text_patch.set("#btn-import", i18n.get("import_save"))
+    text_patch.set("#btn-replay", i18n.get("export_replay"))
+    text_patch.set("#resource-panel h2", i18n.get("core_assets"))
+    text_patch.set("#action-panel h2", i18n.get("system_ops"))
+    text_patch.set("#quest-panel h2", i18n.get("active_contracts"))
+    text_patch.set("#status-text", i18n.get("status_ready"))
+    text_patch.set("#version", f"{i18n.get('ver_prefix')} v0.1.0-ALPHA")
     
     # 显示黑客等级
-    status_bar = document.getElementById("status-bar")
-    level_span = document.getElementById("level-display")
-    if not level_span:
+    if not document.getElementById("level-display"):
+        status_bar = document.getElementById("status-bar")
         level_span = document.createElement("span")
         level_span.id = "level-display"
         status_bar.insertBefore(level_span, status_bar.firstChild)
-    level_span.innerText = f"{i18n.get('hacking_level')}: {state.hacking_level} | "
+    text_patch.set("#level-display", f"{i18n.get('hacking_level')}: {state.hacking_level} | ")
 
     # 更新资源显示
-    res_list = document.getElementById("resources-list")
-    res_list.innerHTML = ""
-    for res_id, amount in state.resources.items():
-        res_item = document.createElement("div")
-        res_item.className = "resource-item"
-        # 使用 i18n 获取资源名称
-        display_name = i18n.get_res_name(res_id, manager.definitions["resources"])
-        
-        # 获取上限 (如果存在)
-        cap = getattr(state, 'storage_caps', {}).get(res_id)
-        cap_str = f" / {int(cap)}" if cap is not None else ""
-        
-        res_item.innerHTML = f"<span>{display_name}:</span> <span>{int(amount)}{cap_str}</span>"
-        res_list.appendChild(res_item)
+    manager.forecaster.poll()
+    res_panel = get_panel("resources-list", make_resource_node)
+    if res_panel:
+        items = []
+        for res_id, amount in state.resources.items():
+            # 使用 i18n 获取资源名称
+            display_name = i18n.get_res_name(res_id, manager.definitions["resources"])
+            
+            # 获取上限 (如果存在)
+            cap = getattr(state, 'storage_caps', {}).get(res_id)
+            cap_str = f" / {int(cap)}" if cap is not None else ""
+            
+            cap_eta = manager.forecaster.seconds_until_cap(res_id)
+            title = f"{i18n.get('full_in')} {format_duration(math.ceil(cap_eta))}" if 0 < cap_eta < math.inf else ""
+            items.append((res_id, {"name": f"{display_name}:", "value": f"{int(amount)}{cap_str}", "title": title}))
+        res_panel.update(items)
 
     # 更新基础设施显示
     if hasattr(manager, 'definitions') and "buildings" in manager.definitions:
@@ -114,228 +327,133 @@ def update_ui():
         update_archives_ui()
 
     # 更新守护程序显示
-    daemon_list_div = document.getElementById("daemons-list")
-    if daemon_list_div:
-        daemon_list_div.innerHTML = ""
+    daemon_panel = get_panel("daemons-list", make_daemon_node)
+    if daemon_panel:
+        items = []
         for i, daemon in enumerate(state.daemons):
-            d_item = document.createElement("div")
-            d_item.className = "daemon-item"
-            if i == state.active_daemon_index:
-                d_item.className += " active"
-            
-            name = daemon["name"] 
-            d_item.innerHTML = f"""
-                <div class="daemon-header">
-                    <span class="daemon-name">{name}</span>
-                    <span class="daemon-level">Lv.{daemon['level']}</span>
-                </div>
-                <div class="daemon-xp-bar">
-                    <div class="daemon-xp-fill" style="width: {(daemon['xp']/daemon['xp_to_next'])*100}%"></div>
-                </div>
-                <div class="daemon-stats">
-                    INT:{int(daemon['stats']['intrusion'])} | SHD:{int(daemon['stats']['shielding'])}
-                </div>
-            """
-            # 绑定点击切换
-            def make_switch_handler(idx):
-                def handler(event):
-                    state.active_daemon_index = idx
-                    update_ui()
-                return handler
-            
-            d_item.onclick = create_proxy(make_switch_handler(i))
-            daemon_list_div.appendChild(d_item)
-
-            # 添加“重构”按钮
-            refactor_btn = document.createElement("button")
-            refactor_btn.innerText = "重构 (SP: " + str(daemon.get('sp', 0)) + ")"
-            refactor_btn.className = "refactor-btn-mini"
-            def make_refactor_handler(idx):
-                def handler(event):
-                    event.stopPropagation()
-                    show_refactor_ui(idx)
-                return handler
-            refactor_btn.onclick = create_proxy(make_refactor_handler(i))
-            d_item.appendChild(refactor_btn)
+            items.append((i, {
+                "class": "daemon-item active" if i == state.active_daemon_index else "daemon-item",
+                "name": str(daemon["name"]),
+                "level": f"Lv.{daemon['level']}",
+                "xp": f"{(daemon['xp']/daemon['xp_to_next'])*100}%",
+                "stats": f"INT:{int(daemon['stats']['intrusion'])} | SHD:{int(daemon['stats']['shielding'])}",
+                "refactor": "重构 (SP: " + str(daemon.get('sp', 0)) + ")",
+            }))
+        daemon_panel.update(items)
 
     # 更新任务显示
-    quest_list_div = document.getElementById("quests-list")
-    if quest_list_div:
-        quest_list_div.innerHTML = ""
+    quest_panel = get_panel("quests-list", make_quest_node)
+    if quest_panel:
+        items = []
         for quest in state.active_quests:
             defn = quest_mgr.definitions.get(quest["id"])
             if not defn: continue
             
-            q_item = document.createElement("div")
-            q_item.className = "quest-item"
-            if quest["completed"]:
-                q_item.className += " completed"
-            
-            name = defn["name"]
-            desc = defn["desc"]
             progress_pct = min(100, (quest["progress"] / defn["target_amount"]) * 100)
-            
-            q_item.innerHTML = f"""
-                <div class="quest-header">
-                    <span>{name}</span>
-                    <span>{int(quest['progress'])}/{defn['target_amount']}</span>
-                </div>
-                <div class="quest-desc">{desc}</div>
-                <div class="quest-progress-bar">
-                    <div class="quest-progress-fill" style="width: {progress_pct}%"></div>
-                </div>
-            """
-            
-            if quest["completed"]:
-                btn = document.createElement("button")
-                btn.className = "quest-reward-btn"
-                btn.innerText = i18n.get("claim_reward")
-                
-                def make_claim_handler(qid):
-                    def handler(event):
-                        success, rewards = quest_mgr.claim_reward(qid)
-                        if success:
-                            # 显示奖励消息
-                            reward_msg = ", ".join([f"+{v} {k}" for k, v in rewards.items()])
-                            log_div = document.getElementById("story-log")
-                            entry = document.createElement("div")
-                            entry.className = "log-entry"
-                            entry.innerText = f"> 任务完成！获得奖励: {reward_msg}"
-                            log_div.appendChild(entry)
-                            log_div.scrollTop = log_div.scrollHeight
-                            update_ui()
-                    return handler
-                
-                btn.onclick = create_proxy(make_claim_handler(quest["id"]))
-                q_item.appendChild(btn)
-                
-            quest_list_div.appendChild(q_item)
+            items.append((quest["id"], {
+                "class": "quest-item completed" if quest["completed"] else "quest-item",
+                "name": defn["name"],
+                "progress": f"{int(quest['progress'])}/{defn['target_amount']}",
+                "desc": defn["desc"],
+                "fill": f"{progress_pct}%",
+                "claim": i18n.get("claim_reward"),
+                "claim_display": "" if quest["completed"] else "none",
+            }))
+        quest_panel.update(items)
 
     # 更新剧情面板
     current_node = story.get_current_node()
     if current_node:
-        log_div = document.getElementById("story-log")
         # 仅当节点改变时更新文本（简单实现）
-        if not hasattr(update_ui, "last_node") or update_ui.last_node != state.current_story_node:
-            entry = document.createElement("div")
-            entry.className = "log-entry"
-            entry.innerText = f"> {current_node['text']}"
-            log_div.appendChild(entry)
-            log_div.scrollTop = log_div.scrollHeight
-            update_ui.last_node = state.current_story_node
+        if not hasattr(render_ui, "last_node") or render_ui.last_node != state.current_story_node:
+            # 读档后日志中已有当前节点的文本，不再重复追加
+            if state.story_log.last_text("story") != current_node['text']:
+                state.story_log.append("story", current_node['text'])
+            render_ui.last_node = state.current_story_node
             
             # 更新选项
             choice_div = document.getElementById("story-choices")
+            router.bind(choice_div)
             choice_div.innerHTML = ""
             if "actions" in current_node:
                 for cid, cdef in current_node["actions"].items():
                     btn = document.createElement("button")
                     btn.innerText = cdef.get("label", cid)
-                    # 绑定点击事件
-                    def make_handler(node_id, choice_id):
-                        def handler(event):
-                            # 检查是否有任务接受逻辑
-                            current_node = story.story_nodes.get(node_id)
-                            if current_node:
-                                action = current_node["actions"].get(choice_id)
-                                if action and "quest_id" in action:
-                                    quest_mgr.accept_quest(action["quest_id"])
-                                    # 特殊逻辑：如果是黑市购买守护程序
-                                    if action["quest_id"] == "unlock_data_ghost":
-                                        new_daemon = daemon_mgr.create_daemon("data_ghost", level=1)
-                                        if new_daemon:
-                                            state.daemons.append(new_daemon)
-                                            quest_mgr.update_progress("special", amount=1)
-                            
-                            if story.trigger_choice(choice_id):
-                                update_ui()
-                        return handler
-                    
-                    btn.onclick = create_proxy(make_handler(state.current_story_node, cid))
+                    set_action(btn, "story_choice", cid)
+                    btn.setAttribute("data-node", state.current_story_node)
                     choice_div.appendChild(btn)
 
-    # 更新状态栏
-    document.getElementById("tick-timer").innerText = f"TICK: {state.tick_count}"
+    # 剧情日志只追加新记录
+    log_view.sync()
+
+    # 更新状态栏 (悬停显示运行时计数器)
+    text_patch.set("#tick-timer", f"TICK: {state.tick_count}")
+    text_patch.set("#tick-timer", perf.summary(), "title")
 
     # 更新侧边栏标签页显示
     update_side_tabs_visibility()
 
     # 更新地牢显示
-    if state.current_story_node == "dungeon_start" and not combat_eng.is_active:
-        document.getElementById("dungeon-container").style.display = "flex"
-        document.getElementById("dungeon-grid").innerText = dungeon.render()
+    in_combat = is_loaded(combat_eng) and combat_eng.is_active
+    if state.current_story_node == "dungeon_start" and not in_combat:
+        text_patch.set("#dungeon-container", "flex", "style.display")
+        render_dungeon()
     else:
-        document.getElementById("dungeon-container").style.display = "none"
+        text_patch.set("#dungeon-container", "none", "style.display")
 
     # 更新战斗显示
-    combat_scene = document.getElementById("combat-scene")
-    if combat_eng.is_active:
-        combat_scene.style.display = "flex"
+    if in_combat:
+        text_patch.set("#combat-scene", "flex", "style.display")
         
         # 更新敌人信息
-        document.getElementById("enemy-intent").innerText = f"NEXT: [{combat_eng.enemy_intent['name'].upper()}]"
-        document.getElementById("enemy-hp-fill").style.width = f"{(combat_eng.enemy_hp / combat_eng.enemy['max_hp']) * 100}%"
+        text_patch.set("#enemy-intent", f"NEXT: [{combat_eng.enemy_intent['name'].upper()}]")
+        text_patch.set("#enemy-hp-fill", f"{(combat_eng.enemy_hp / combat_eng.enemy['max_hp']) * 100}%", "style.width")
         
         # 更新玩家信息
         active_daemon = daemon_mgr.get_active_daemon()
         if active_daemon:
-            document.getElementById("active-daemon-name").innerText = active_daemon["name"].get(state.language)
-            document.getElementById("player-hp-fill").style.width = f"{(combat_eng.player_hp / combat_eng.player_max_hp) * 100}%"
-            document.getElementById("player-bw-fill").style.width = f"{combat_eng.player_bw}%"
+            text_patch.set("#active-daemon-name", active_daemon["name"].get(state.language))
+            text_patch.set("#player-hp-fill", f"{(combat_eng.player_hp / combat_eng.player_max_hp) * 100}%", "style.width")
+            text_patch.set("#player-bw-fill", f"{combat_eng.player_bw}%", "style.width")
             
         # 更新战斗日志
-        log_area = document.getElementById("combat-log-area")
-        log_area.innerHTML = "".join([f"<div>{l}</div>" for l in combat_eng.log])
-        log_area.scrollTop = log_area.scrollHeight
+        combat_log_view.sync()
         
         # 更新动作按钮
-        actions_div = document.getElementById("combat-actions")
-        actions_div.innerHTML = ""
-        
         # 基础动作
         base_actions = [("attack", "基础攻击 (20% BW)"), ("defend", "防御 (恢复 BW)"), ("reset", "重置 (大恢复)")]
         
         # 技能动作 (仅显示已挂载的技能)
         equipped_ids = active_daemon.get("equipped_skills", [])
-        defn = daemon_mgr.definitions[active_daemon["id"]]
         all_actions = base_actions.copy()
         
         for sid in equipped_ids:
-            skill_defn = next((s for s in defn["skill_tree"] if s["id"] == sid), None)
+            skill_defn = daemon_mgr.get_skill(active_daemon["id"], sid)
             if skill_defn:
                 all_actions.append((sid, f"{skill_defn['name']} ({skill_defn['bw_cost']}% BW)"))
 
-        for aid, label in all_actions:
-            btn = document.createElement("button")
-            btn.innerText = label
-            def make_combat_handler(action_id):
-                def handler(event):
-                    combat_eng.execute_player_action(action_id)
-                    update_ui()
-                return handler
-            btn.onclick = create_proxy(make_combat_handler(aid))
-            actions_div.appendChild(btn)
+        actions_panel = get_panel("combat-actions", make_combat_action_node)
+        actions_panel.update([(aid, {"label": label}) for aid, label in all_actions])
     else:
-        combat_scene.style.display = "none"
+        text_patch.set("#combat-scene", "none", "style.display")
+
+# 增量自动存档：只在状态变化后 (去抖) 写入变化的分段 (start_game 中打开存储后端后创建)
+autosave = None
 
 async def game_loop():
     """主游戏循环"""
-    last_time = time.time()
+    # 以整数毫秒计时，录像中记录的间隔可以逐位复现
+    last_ms = int(time.time() * 1000)
     while True:
-        current_time = time.time()
-        delta_time = current_time - last_time
-        last_time = current_time
-        
-        manager.tick(delta_time)
-        
-        # 每秒检查一次收集任务进度
-        quest_mgr.update_progress("collect", "data_scraps")
+        now_ms = int(time.time() * 1000)
+        session.tick(now_ms - last_ms)
+        last_ms = now_ms
+        state.last_update = now_ms / 1000
         
         update_ui()
         
-        # 每 10 秒自动保存一次
-        if state.tick_count % 10 == 0:
-            save_to_local(state)
+        # 自动存档 (无变化时不写盘)
+        autosave.tick()
             
         await asyncio.sleep(1)
 
@@ -354,58 +472,43 @@ def move_right(event=None):
     handle_move(1, 0)
 
 def handle_move(dx, dy):
-    result, msg = dungeon.move_player(dx, dy)
+    result, msg = session.move(dx, dy)
     if msg:
-        log_div = document.getElementById("story-log")
-        entry = document.createElement("div")
-        entry.className = "log-entry"
-        entry.innerText = f"> {msg}"
-        log_div.appendChild(entry)
-        log_div.scrollTop = log_div.scrollHeight
-    
-    # 根据结果给予奖励
-    if result == "LOOT":
-        state.resources["credits"] += 20
-        state.resources["data_scraps"] += 1
-        quest_mgr.update_progress("collect", "data_scraps")
-    elif result == "ENEMY":
-        # 切换到战斗模式
-        combat_eng.start_combat("SECURITY_NODE", dungeon.current_level)
-        update_ui()
-        return # 战斗逻辑由 CombatEngine 接管
-    elif result == "INFO":
-        state.resources["hacking_xp"] += 10
-    elif result == "QUEST":
-        state.resources["compute"] += 2
-    elif result == "EXIT":
-        dungeon.generate_level(dungeon.current_level + 1)
-        quest_mgr.update_progress("explore", amount=dungeon.current_level)
-    
+        append_log(msg, "move")
     update_ui()
 
 async def switch_language(event=None):
     state.language = "en" if state.language == "zh" else "zh"
     await load_game_data()
     # 强制重置剧情显示以刷新翻译
-    if hasattr(update_ui, "last_node"):
-        delattr(update_ui, "last_node")
+    if hasattr(render_ui, "last_node"):
+        delattr(render_ui, "last_node")
     update_ui()
-    save_to_local(state)
+    autosave.save(force=True)
 
 def export_save(event=None):
     save_str = export_save_string(state)
     window.prompt(i18n.get("save_prompt"), save_str)
 
+def export_replay(event=None):
+    """导出本次会话的录像 (起始存档 + 输入)，可用 python -m engine.replay 无头回放校验"""
+    replay_str = dumps_replay(session.recorder.to_data(state))
+    window.prompt(i18n.get("replay_prompt"), replay_str)
+
 async def import_save_dialog(event=None):
     save_str = window.prompt(i18n.get("load_prompt"))
     if save_str:
         success, msg = import_save_string(state, save_str)
         if success:
-            # 导入后可能语言变了，重新加载数据
+            # 从导入的存档重新开始录制；地牢与读档后一样从第 1 层重新生成
+            session.recorder = InputRecorder(state)
+            if is_loaded(dungeon):
+                dungeon.generate_level(1)
+            # 导入后可能语言变了，切换字符串层
             await load_game_data()
             # 强制重置剧情显示
-            if hasattr(update_ui, "last_node"):
-                delattr(update_ui, "last_node")
+            if hasattr(render_ui, "last_node"):
+                delattr(render_ui, "last_node")
             update_ui()
         else:
             window.alert(msg)
@@ -447,74 +550,77 @@ def update_side_tabs_visibility():
 
 # --- 基础设施 UI 逻辑 ---
 
+def make_building_node(b_id):
+    item = create_element("div", "infra-item")
+    header = create_element("div", "infra-header", item)
+    name = create_element("span", parent=header)
+    level = create_element("span", parent=header)
+    desc = create_element("div", "infra-desc", item)
+    cost = create_element("div", "infra-cost", item)
+
+    btn = create_element("button", "infra-build-btn", item)
+    set_action(btn, "build", b_id)
+
+    # 批量购买：一次升级到当前资源允许的最高等级
+    max_btn = create_element("button", "infra-build-btn", item)
+    set_action(max_btn, "build_max", b_id)
+
+    return item, {
+        "name": (name, "text"),
+        "level": (level, "text"),
+        "desc": (desc, "text"),
+        "cost": (cost, "text"),
+        "build": (btn, "text"),
+        "disabled": (btn, "disabled"),
+        "opacity": (btn, "style.opacity"),
+        "max": (max_btn, "text"),
+        "max_display": (max_btn, "style.display"),
+    }
+
 def update_infrastructure_ui():
     """更新硬件和软件建筑列表"""
+    # 可负担性来自预测器，只有到期事件或资源跳变时才会重新计算
+    forecaster = manager.forecaster
+    forecaster.poll()
     for category in ["hardware", "software"]:
-        list_div = document.getElementById(f"{category}-list")
-        if not list_div: continue
+        panel = get_panel(f"{category}-list", make_building_node, empty_key="no_infra")
+        if not panel: continue
         
-        list_div.innerHTML = ""
         buildings_def = manager.definitions.get("buildings", {}).get(category, {})
-        
-        if not buildings_def:
-            empty_msg = document.createElement("div")
-            empty_msg.className = "empty-msg"
-            empty_msg.innerText = i18n.get("no_infra")
-            list_div.appendChild(empty_msg)
-        else:
-            for b_id, b_def in buildings_def.items():
-                # 检查前置条件
-                if "requires_artifact" in b_def:
-                    if b_def["requires_artifact"] not in state.artifacts:
-                        continue # 隐藏未解锁的建筑
-                
-                level = state.buildings.get(b_id, 0)
-                multiplier = b_def.get("cost_multiplier", 1.5)
-                
-                # 计算成本
-                costs = []
-                can_afford = True
-                for res, base_amount in b_def["cost"].items():
-                    actual_cost = int(base_amount * (multiplier ** level))
-                    res_name = i18n.get_res_name(res, manager.definitions["resources"])
-                    costs.append(f"{actual_cost} {res_name}")
-                    if state.resources.get(res, 0) < actual_cost:
-                        can_afford = False
-                
-                cost_str = ", ".join(costs)
-                
-                item = document.createElement("div")
-                item.className = "infra-item"
-                item.innerHTML = f"""
-                    <div class="infra-header">
-                        <span>{b_def['name']}</span>
-                        <span>Lv.{level}</span>
-                    </div>
-                    <div class="infra-desc">{b_def['desc']}</div>
-                    <div class="infra-cost">Cost: {cost_str}</div>
-                """
-                
-                btn = document.createElement("button")
-                btn.className = "infra-build-btn"
-                btn.innerText = "UPGRADE" if level > 0 else "BUILD"
-                if not can_afford:
-                    btn.disabled = True
-                    btn.style.opacity = "0.5"
-                
-                def make_build_handler(bid):
-                    def handler(event):
-                        success, msg = manager.build(bid)
-                        if success:
-                            if hasattr(window, 'npc_mgr'):
-                                window.npc_mgr.check_reaction("build_complete")
-                            update_ui()
-                        else:
-                            window.alert(msg)
-                    return handler
-                
-                btn.onclick = create_proxy(make_build_handler(b_id))
-                item.appendChild(btn)
-                list_div.appendChild(item)
+        items = []
+        for b_id, b_def in buildings_def.items():
+            # 检查前置条件
+            if "requires_artifact" in b_def:
+                if b_def["requires_artifact"] not in state.artifacts:
+                    continue # 隐藏未解锁的建筑
+            
+            level = state.buildings.get(b_id, 0)
+            
+            # 成本由 GameManager 按建筑缓存，仅在等级变化时重算
+            actual_costs = manager.building_cost(b_id)
+            can_afford = forecaster.is_affordable(b_id)
+            costs = []
+            for res, actual_cost in actual_costs.items():
+                res_name = i18n.get_res_name(res, manager.definitions["resources"])
+                costs.append(f"{int(actual_cost)} {res_name}")
+            
+            cost_str = ", ".join(costs)
+            eta = forecaster.seconds_until_affordable(b_id)
+            if 0 < eta < math.inf:
+                cost_str += f" ({i18n.get('affordable_in')} {format_duration(math.ceil(eta))})"
+            
+            items.append((b_id, {
+                "name": b_def["name"],
+                "level": f"Lv.{level}",
+                "desc": b_def["desc"],
+                "cost": f"Cost: {cost_str}",
+                "build": "UPGRADE" if level > 0 else "BUILD",
+                "disabled": not can_afford,
+                "opacity": "1" if can_afford else "0.5",
+                "max": i18n.get("buy_max").format(count=manager.max_affordable(b_id)) if can_afford else "",
+                "max_display": "" if can_afford else "none",
+            }))
+        panel.update(items)
 
 def show_infra_tab(category, event=None):
     """切换基础设施标签页"""
@@ -530,42 +636,31 @@ def show_infra_tab(category, event=None):
         else:
             tab.classList.remove("active")
 
+def make_artifact_node(art_id):
+    item = create_element("div", "artifact-item")
+    name = create_element("div", "artifact-name", item)
+    desc = create_element("div", "artifact-desc", item)
+    content = create_element("div", "artifact-content", item)
+    set_action(item, "toggle_artifact", art_id)
+
+    return item, {"name": (name, "text"), "desc": (desc, "text"), "content": (content, "text")}
+
 def update_archives_ui():
     """更新系统档案列表"""
-    list_div = document.getElementById("artifacts-list")
-    if not list_div: return
+    panel = get_panel("artifacts-list", make_artifact_node, empty_key="no_artifacts")
+    if not panel: return
     
-    list_div.innerHTML = ""
     # 动态更新标题
     archives_title = i18n.get("archives")
     if archives_title != "archives":
-        document.querySelector("#archives-panel h2").innerText = archives_title
+        text_patch.set("#archives-panel h2", archives_title)
     
-    if not state.artifacts:
-        empty_msg = document.createElement("div")
-        empty_msg.className = "empty-msg"
-        empty_msg.innerText = i18n.get("no_artifacts")
-        list_div.appendChild(empty_msg)
-    else:
-        for art_id in state.artifacts:
-            art_def = manager.definitions.get("artifacts", {}).get(art_id)
-            if not art_def: continue
-            
-            item = document.createElement("div")
-            item.className = "artifact-item"
-            item.innerHTML = f"""
-                <div class="artifact-name">{art_def['name']}</div>
-                <div class="artifact-desc">{art_def['desc']}</div>
-                <div class="artifact-content">{art_def['content']}</div>
-            """
-            
-            def make_toggle_handler(target_item):
-                def handler(event):
-                    target_item.classList.toggle("expanded")
-                return handler
-            
-            item.onclick = create_proxy(make_toggle_handler(item))
-            list_div.appendChild(item)
+    items = []
+    for art_id in state.artifacts:
+        art_def = manager.definitions.get("artifacts", {}).get(art_id)
+        if not art_def: continue
+        items.append((art_id, {"name": art_def["name"], "desc": art_def["desc"], "content": art_def["content"]}))
+    panel.update(items)
 
 def show_side_tab(tab_id, event=None):
     """切换右侧侧边栏标签页"""
@@ -604,7 +699,7 @@ def update_side_tabs_visibility():
 def show_refactor_ui(daemon_idx):
     state.current_refactor_idx = daemon_idx
     daemon = state.daemons[daemon_idx]
-    defn = daemon_mgr.definitions[daemon["id"]]
+    table = daemon_mgr.skill_tables[daemon["id"]]
     
     document.getElementById("refactor-overlay").style.display = "flex"
     document.getElementById("refactor-daemon-name").innerText = daemon["name"]
@@ -612,14 +707,15 @@ def show_refactor_ui(daemon_idx):
     document.getElementById("ref_sp").innerText = str(daemon["sp"])
     
     container = document.getElementById("skill-tree-container")
+    router.bind(container)
     container.innerHTML = ""
     
-    for skill in defn["skill_tree"]:
+    for skill_id, skill in table.skills.items():
         node = document.createElement("div")
         node.className = "skill-node"
         
-        is_learned = skill["id"] in daemon["learned_skills"]
-        is_locked = skill["req"] and skill["req"] not in daemon["learned_skills"]
+        is_learned = skill_id in daemon["learned_skills"]
+        is_locked = bool(table.missing_prereqs(skill_id, daemon["learned_skills"]))
         
         if is_learned: node.className += " learned"
         if is_locked: node.className += " locked"
@@ -634,16 +730,7 @@ def show_refactor_ui(daemon_idx):
         if not is_learned and not is_locked:
             btn = document.createElement("button")
             btn.innerText = "学习"
-            def make_learn_handler(sid):
-                def handler(event):
-                    success, msg = daemon_mgr.learn_skill(state.current_refactor_idx, sid)
-                    if success:
-                        show_refactor_ui(state.current_refactor_idx)
-                        update_ui()
-                    else:
-                        window.alert(msg)
-                return handler
-            btn.onclick = create_proxy(make_learn_handler(skill["id"]))
+            set_action(btn, "learn_skill", skill["id"])
             node.appendChild(btn)
         elif is_learned:
             status = document.createElement("span")
@@ -656,30 +743,84 @@ def close_refactor_ui(event=None):
     document.getElementById("refactor-overlay").style.display = "none"
     state.current_refactor_idx = None
 
+# --- 日志与离线结算 ---
+
+def append_log(text, kind="story"):
+    """向剧情日志追加一条记录 (在下一次重绘时由 log_view 显示)"""
+    state.story_log.append(kind, text)
+    update_ui()
+
+def format_duration(seconds):
+    """将秒数格式化为 1h05m / 2m13s"""
+    seconds = int(seconds)
+    hours, rem = divmod(seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{secs:02d}s"
+
+def format_offline_summary(summary):
+    """将 GameManager.advance 的结果格式化为“离线期间”消息"""
+    duration = format_duration(summary["elapsed"])
+
+    parts = []
+    for res_id, delta in summary["gains"].items():
+        name = i18n.get_res_name(res_id, manager.definitions["resources"])
+        parts.append(f"{'+' if delta >= 0 else ''}{int(delta)} {name}")
+    rolls = sum(summary["events"].values())
+    if rolls:
+        parts.append(f"{rolls} {i18n.get('offline_events')}")
+
+    header = i18n.get("offline_report").format(duration=duration)
+    return f"{header}: {', '.join(parts)}" if parts else header
+
 # --- 初始化流程 ---
 
 async def start_game():
+    global autosave
     # 1. 加载配置
     await load_game_data()
+    startup.mark("data_load")
     
-    # 2. 尝试从本地加载存档
-    if load_from_local(state):
-        print("已恢复存档")
+    # 2. 打开存储后端 (优先 IndexedDB) 并尝试加载存档
+    backend = await open_backend()
+    autosave = AutoSaver(state, backend, counters=perf)
+    restored = load_saved(state, backend)
+    if restored:
+        autosave.mark_loaded()
+    elif not isinstance(backend, LocalStorageBackend) and load_saved(state, LocalStorageBackend()):
+        # 旧版本的存档在 localStorage 中：读出后整体写入新后端 (旧键保留，不做删除)
+        restored = True
+        autosave.save(force=True)
+
+    if restored:
+        print(f"已恢复存档 ({backend.name})")
     else:
         print("开启新游戏")
         state.seed = rng.get_seed()
         
         # 初始赠送一个守护程序 (改为新职业 ID)
-        initial_daemon = daemon_mgr.create_daemon("vanguard", level=1)
-        if initial_daemon:
-            state.daemons.append(initial_daemon)
-
-    # 初始化地牢
-    dungeon.generate_level(1)
-
-    # 3. 移除加载遮罩，显示游戏界面
+        # 直接由已载入的职业定义构造，不触发守护程序子系统的加载
+        starter_defn = game_content.get("daemons", {}).get("vanguard")
+        if starter_defn:
+            state.daemons.append(new_daemon("vanguard", starter_defn, level=1))
+
+    # 地牢在第一次进入时才生成 (见 make_dungeon)
+
+    # 结算离线期间的进度
+    if state.last_update:
+        summary = manager.advance(time.time() - state.last_update)
+        if summary:
+            append_log(format_offline_summary(summary), "system")
+    state.last_update = time.time()
+    # 从此刻的状态开始录制输入 (地牢尚未生成，与回放时读档后再生成的顺序一致)
+    session.recorder = InputRecorder(state)
+    startup.mark("save_restore")
+
+    # 3. 移除加载遮罩，显示游戏界面 (首帧同步绘制以便计时)
     document.getElementById("loading-overlay").style.display = "none"
     document.getElementById("game-container").style.display = "flex"
+    render_ui()
+    startup.mark("first_paint")
+    print(startup.report())
     
     # 4. 启动循环
     await game_loop()
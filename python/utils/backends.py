@@ -0,0 +1,238 @@
+"""
+存档存储后端。
+
+所有后端提供相同的接口：
+    await backend.open()      打开并预读 (之后 get 都是同步的)
+    backend.get(key)          读取字符串 / bytes，不存在时返回 None
+    backend.set(key, value)   写入队列，立即返回
+    backend.remove(key)       删除也进入写入队列
+    await backend.flush()     把队列中的写入一次性批量提交
+
+写入只进入队列，由 flush 在单独的协程里提交，游戏循环不等待存储本身的提交
+(序列化仍由调用方同步完成，见 utils/storage.py 的 AutoSaver)。
+binary 为 True 的后端可以直接保存 bytes，否则只能保存字符串。
+
+    LocalStorageBackend - 浏览器 localStorage (同步、仅字符串、约 5 MB)
+    IndexedDBBackend    - 浏览器 IndexedDB (异步、可存二进制、容量大)
+    MemoryBackend       - 内存字典，可选落盘到目录 (无头运行 / 基准)
+"""
+import asyncio
+import os
+from urllib.parse import quote, unquote
+
+class StorageBackend:
+    name = "base"
+    binary = False
+
+    def __init__(self):
+        self.pending = {} # { key: 值，None 表示删除 }
+        self.flushing = False
+
+    async def open(self):
+        return self
+
+    def get(self, key):
+        if key in self.pending:
+            return self.pending[key]
+        return self._read(key)
+
+    def set(self, key, value):
+        self.pending[key] = value
+
+    def remove(self, key):
+        self.pending[key] = None
+
+    def has_pending(self):
+        return bool(self.pending)
+
+    async def flush(self):
+        """提交队列中的全部写入，返回提交的键数；已有 flush 在进行时直接返回 0 (新写入由它顺带提交)"""
+        if self.flushing: return 0
+        self.flushing = True
+        written = 0
+        try:
+            while self.pending:
+                batch, self.pending = self.pending, {}
+                try:
+                    await self._write_batch(batch)
+                except Exception:
+                    # 提交失败：放回队列 (不覆盖期间的新写入)，下次 flush 重试
+                    for key, value in batch.items():
+                        self.pending.setdefault(key, value)
+                    raise
+                written += len(batch)
+        finally:
+            self.flushing = False
+        return written
+
+    def _read(self, key):
+        raise NotImplementedError
+
+    async def _write_batch(self, batch):
+        raise NotImplementedError
+
+class MemoryBackend(StorageBackend):
+    """
+    内存后端。指定 path 时每个键保存为目录下的一个文件 (.txt 为字符串，.bin 为二进制)，
+    open 时读回，可用于无头运行之间保留存档。
+    """
+    name = "memory"
+    binary = True
+
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path
+        self.data = {}
+        if path:
+            self.name = "file"
+
+    async def open(self):
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+            for filename in os.listdir(self.path):
+                key, ext = os.path.splitext(filename)
+                if ext not in (".txt", ".bin"): continue
+                with open(os.path.join(self.path, filename), "rb") as f:
+                    raw = f.read()
+                self.data[unquote(key)] = raw.decode("utf-8") if ext == ".txt" else raw
+        return self
+
+    def _read(self, key):
+        return self.data.get(key)
+
+    def _file(self, key, ext):
+        return os.path.join(self.path, quote(key, safe="") + ext)
+
+    async def _write_batch(self, batch):
+        for key, value in batch.items():
+            if self.path:
+                ext = None if value is None else (".txt" if isinstance(value, str) else ".bin")
+                for stale in (".txt", ".bin"):
+                    if stale != ext and os.path.exists(self._file(key, stale)):
+                        os.remove(self._file(key, stale))
+                if ext:
+                    # 先写临时文件再原子替换，中途退出不会留下半个存档
+                    target = self._file(key, ext)
+                    with open(target + ".tmp", "wb") as f:
+                        f.write(value.encode("utf-8") if isinstance(value, str) else value)
+                    os.replace(target + ".tmp", target)
+                await asyncio.sleep(0)
+            if value is None:
+                self.data.pop(key, None)
+            else:
+                self.data[key] = value
+
+class LocalStorageBackend(StorageBackend):
+    """浏览器 localStorage：只能存字符串；写入批量提交，每个键之间让出一次事件循环"""
+    name = "localStorage"
+    binary = False
+
+    def __init__(self, storage=None):
+        super().__init__()
+        if storage is None:
+            from js import localStorage as storage
+        self.storage = storage
+
+    def _read(self, key):
+        return self.storage.getItem(key)
+
+    async def _write_batch(self, batch):
+        for key, value in batch.items():
+            if value is None:
+                self.storage.removeItem(key)
+            else:
+                self.storage.setItem(key, value)
+            await asyncio.sleep(0)
+
+async def _settle(target, success, failures):
+    """等待 IndexedDB 请求或事务的回调；回调触发后销毁代理"""
+    from pyodide.ffi import create_proxy
+    future = asyncio.get_event_loop().create_future()
+
+    def on_success(event):
+        if not future.done(): future.set_result(None)
+
+    def on_failure(event):
+        if not future.done(): future.set_exception(OSError(f"IndexedDB: {target.error}"))
+
+    proxies = [create_proxy(on_success), create_proxy(on_failure)]
+    setattr(target, success, proxies[0])
+    for failure in failures:
+        setattr(target, failure, proxies[1])
+    try:
+        await future
+    finally:
+        for proxy in proxies:
+            proxy.destroy()
+
+class IndexedDBBackend(StorageBackend):
+    """
+    浏览器 IndexedDB：open 时一次读出全部键值放入缓存，之后 get 同步读缓存；
+    每次 flush 的全部写入在同一个 readwrite 事务中提交。bytes 以 Uint8Array 保存。
+    """
+    name = "IndexedDB"
+    binary = True
+
+    def __init__(self, db_name="cyber-idle", store_name="saves"):
+        super().__init__()
+        self.db_name = db_name
+        self.store_name = store_name
+        self.db = None
+        self.cache = {}
+
+    @staticmethod
+    def available():
+        try:
+            from js import indexedDB
+            return bool(indexedDB)
+        except ImportError:
+            return False
+
+    async def open(self):
+        from js import indexedDB
+        from pyodide.ffi import create_proxy
+        request = indexedDB.open(self.db_name, 1)
+        upgrade = create_proxy(lambda event: request.result.createObjectStore(self.store_name))
+        request.onupgradeneeded = upgrade
+        try:
+            await _settle(request, "onsuccess", ["onerror", "onblocked"])
+        finally:
+            upgrade.destroy()
+        self.db = request.result
+
+        tx = self.db.transaction(self.store_name, "readonly")
+        store = tx.objectStore(self.store_name)
+        keys = store.getAllKeys()
+        values = store.getAll()
+        await _settle(tx, "oncomplete", ["onerror", "onabort"])
+        for key, value in zip(keys.result.to_py(), values.result):
+            self.cache[key] = value if isinstance(value, str) else value.to_bytes()
+        return self
+
+    def _read(self, key):
+        return self.cache.get(key)
+
+    async def _write_batch(self, batch):
+        from pyodide.ffi import to_js
+        tx = self.db.transaction(self.store_name, "readwrite")
+        store = tx.objectStore(self.store_name)
+        for key, value in batch.items():
+            if value is None:
+                store.delete(key)
+            else:
+                store.put(value if isinstance(value, str) else to_js(value), key)
+        await _settle(tx, "oncomplete", ["onerror", "onabort"])
+        for key, value in batch.items():
+            if value is None:
+                self.cache.pop(key, None)
+            else:
+                self.cache[key] = value
+
+async def open_backend():
+    """浏览器中优先使用 IndexedDB，不可用 (或打开失败，例如隐私模式) 时退回 localStorage"""
+    if IndexedDBBackend.available():
+        try:
+            return await IndexedDBBackend().open()
+        except Exception as e:
+            print(f"IndexedDB 不可用，改用 localStorage: {e}")
+    return await LocalStorageBackend().open()
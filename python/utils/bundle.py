@@ -0,0 +1,209 @@
+"""
+内容包：把 data/ 下的全部定义编译成单个文件 data/bundle.bin，启动时一次读取。
+
+包内结构 (marshal 序列化，比 json.loads 快得多，且不需要逐个文件 fetch):
+    version  - BUNDLE_VERSION
+    hash     - 源 JSON 的摘要，用于检查包是否过期
+    ui       - data/ui.json
+    neutral  - 与语言无关的数据 (数值、ID、结构)，本身是一段 marshal 字节，
+               每次本地化时重新解出一份新副本，避免深拷贝
+    paths    - 随语言变化的叶子 (或子树) 在 neutral 中的路径
+    strings  - { 语言: { 路径序号: 值 } }，缺少某个序号表示该语言没有这个键
+
+修改 data/ 后需要重新生成 (在 python/ 目录下):
+    python -m utils.bundle
+"""
+import hashlib
+import json
+import marshal
+import os
+import sys
+
+BUNDLE_MAGIC = b"CYBUNDLE"
+BUNDLE_VERSION = 1
+BUNDLE_PATH = os.path.join("data", "bundle.bin")
+CONTENT_FILES = ["resources", "events", "buildings", "artifacts", "story", "daemons", "quests"]
+LANGUAGES = ["zh", "en"]
+
+def parse_data(data):
+    """定义数据可能来自 JSON 文件 (字符串) 或内容包 (已解析的对象)"""
+    return json.loads(data) if isinstance(data, str) else data
+
+def read_sources(data_dir="data"):
+    """读取原始 JSON 文本 { "ui": 文本, 语言: { 文件名: 文本 } }"""
+    sources = {}
+    with open(os.path.join(data_dir, "ui.json"), "r", encoding="utf-8") as f:
+        sources["ui"] = f.read()
+    for lang in LANGUAGES:
+        sources[lang] = {}
+        for name in CONTENT_FILES:
+            with open(os.path.join(data_dir, lang, f"{name}.json"), "r", encoding="utf-8") as f:
+                sources[lang][name] = f.read()
+    return sources
+
+def source_hash(sources):
+    digest = hashlib.sha1(sources["ui"].encode("utf-8"))
+    for lang in LANGUAGES:
+        for name in CONTENT_FILES:
+            digest.update(sources[lang][name].encode("utf-8"))
+    return digest.hexdigest()
+
+def _split(values, path, paths, strings):
+    """
+    并行遍历各语言的同一节点：结构与取值一致的部分留在 neutral，
+    不一致的叶子 (或结构不同的子树) 记录到 paths / strings，neutral 中以 None 占位。
+    """
+    nodes = list(values.values())
+    first = nodes[0]
+    if len(values) == len(LANGUAGES):
+        if all(isinstance(node, dict) for node in nodes):
+            result = {}
+            keys = list(first)
+            for node in nodes[1:]:
+                keys += [key for key in node if key not in first]
+            for key in dict.fromkeys(keys):
+                sub = {lang: node[key] for lang, node in values.items() if key in node}
+                result[key] = _split(sub, path + (key,), paths, strings)
+            return result
+        if all(isinstance(node, list) for node in nodes) and len({len(node) for node in nodes}) == 1:
+            return [_split({lang: node[i] for lang, node in values.items()}, path + (i,), paths, strings)
+                    for i in range(len(first))]
+        if all(type(node) is type(first) and node == first for node in nodes):
+            return first
+
+    index = len(paths)
+    paths.append(path)
+    for lang, node in values.items():
+        strings[lang][index] = node
+    return None
+
+def build_bundle(data_dir="data"):
+    sources = read_sources(data_dir)
+    trees = {lang: {name: json.loads(sources[lang][name]) for name in CONTENT_FILES} for lang in LANGUAGES}
+    paths = []
+    strings = {lang: {} for lang in LANGUAGES}
+    neutral = _split(trees, (), paths, strings)
+    return {
+        "version": BUNDLE_VERSION,
+        "hash": source_hash(sources),
+        "ui": json.loads(sources["ui"]),
+        "neutral": marshal.dumps(neutral),
+        "paths": paths,
+        "strings": strings,
+    }
+
+def write_bundle(bundle, path=BUNDLE_PATH):
+    # 头部记录 marshal 格式版本，运行时版本不一致时拒绝读取 (见 require_bundle)
+    header = BUNDLE_MAGIC + bytes([BUNDLE_VERSION, marshal.version])
+    with open(path, "wb") as f:
+        f.write(header + marshal.dumps(bundle))
+
+def read_bundle(path=BUNDLE_PATH):
+    """读取内容包；文件不存在、格式或版本不匹配时返回 None"""
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    header = BUNDLE_MAGIC + bytes([BUNDLE_VERSION, marshal.version])
+    if not raw.startswith(header):
+        return None
+    try:
+        bundle = marshal.loads(raw[len(header):])
+    except (EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(bundle, dict) or bundle.get("version") != BUNDLE_VERSION:
+        return None
+    return bundle
+
+def localize(bundle, lang):
+    """合成某种语言的全部定义 { 文件名: 解析后的对象 }"""
+    content = marshal.loads(bundle["neutral"])
+    strings = bundle["strings"].get(lang, {})
+    for index, path in enumerate(bundle["paths"]):
+        parent = content
+        for key in path[:-1]:
+            parent = parent[key]
+        if index in strings:
+            parent[path[-1]] = strings[index]
+        elif isinstance(parent, dict):
+            parent.pop(path[-1], None)
+    return content
+
+class LocalizedContent:
+    """
+    一次装载、之后原地切换语言的定义集合。
+    content 只合成一次，引擎持有其中对象的引用；switch 只把语言相关的槽位换成另一种语言的值
+    (按引用替换，不复制)，数值与结构对象保持同一份，因此引擎状态与各类缓存都不需要重建。
+    """
+
+    def __init__(self, bundle, lang):
+        self.ui = bundle["ui"]
+        self.strings = bundle["strings"]
+        self.content = localize(bundle, lang)
+        self.lang = lang
+        # 预先解析每个槽位的父对象，切换时不再逐级查找路径
+        self.slots = []
+        for path in bundle["paths"]:
+            parent = self.content
+            for key in path[:-1]:
+                parent = parent[key]
+            self.slots.append((parent, path[-1]))
+
+    def switch(self, lang):
+        if lang == self.lang: return
+        strings = self.strings.get(lang, {})
+        for index, (parent, key) in enumerate(self.slots):
+            if index in strings:
+                parent[key] = strings[index]
+            elif isinstance(parent, dict):
+                parent.pop(key, None)
+        self.lang = lang
+
+def require_bundle(bundle_path=BUNDLE_PATH):
+    """
+    读取内容包，不可用时报错。
+    浏览器只 fetch 内容包本身，data/<语言>/*.json 不在页面中，无法现场重新编译，因此不做回退。
+    """
+    bundle = read_bundle(bundle_path)
+    if bundle is None:
+        raise ValueError(f"内容包 {bundle_path} 缺失、损坏或版本不匹配，请在 python/ 目录下运行 python -m utils.bundle 重新生成")
+    return bundle
+
+def open_content(lang, bundle_path=BUNDLE_PATH):
+    """读取内容包并返回 LocalizedContent"""
+    return LocalizedContent(require_bundle(bundle_path), lang)
+
+def load_json_content(lang, data_dir="data"):
+    """逐个读取 JSON 文件 (生成内容包时用于校验，也是基准的对照组)"""
+    with open(os.path.join(data_dir, "ui.json"), "r", encoding="utf-8") as f:
+        ui = json.load(f)
+    content = {}
+    for name in CONTENT_FILES:
+        with open(os.path.join(data_dir, lang, f"{name}.json"), "r", encoding="utf-8") as f:
+            content[name] = json.load(f)
+    return ui, content
+
+def load_content(lang, bundle_path=BUNDLE_PATH):
+    """从内容包读取，返回 (ui, { 文件名: 对象 })"""
+    bundle = require_bundle(bundle_path)
+    return bundle["ui"], localize(bundle, lang)
+
+def main(argv=None):
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "..", "data")
+    data_dir = os.path.normpath(data_dir)
+    bundle = build_bundle(data_dir)
+    out = os.path.join(data_dir, "bundle.bin")
+    write_bundle(bundle, out)
+
+    # 校验：每种语言合成的结果必须与原 JSON 完全一致
+    for lang in LANGUAGES:
+        _, expected = load_json_content(lang, data_dir)
+        if localize(read_bundle(out), lang) != expected:
+            print(f"bundle mismatch for {lang}", file=sys.stderr)
+            return 1
+    print(f"wrote {out} ({os.path.getsize(out)} bytes, {len(bundle['paths'])} localized paths, hash {bundle['hash'][:12]})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
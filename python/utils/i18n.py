@@ -1,4 +1,4 @@
-import json
+from utils.bundle import parse_data
 
 class I18nManager:
     def __init__(self, state):
@@ -7,7 +7,7 @@ class I18nManager:
         self.ui_data = {}
 
     def load_ui_translations(self, json_data):
-        self.ui_data = json.loads(json_data)
+        self.ui_data = parse_data(json_data)
 
     def get(self, key, default=None):
         lang = self.state.language
@@ -0,0 +1,53 @@
+import importlib
+import os
+
+def ensure_files(paths):
+    """
+    确保模块源文件已在虚拟文件系统中。
+    浏览器中这些文件不在 pyscript.json 的启动 fetch 列表里，首次使用时用 open_url 同步拉取；
+    普通 CPython 下文件本来就在磁盘上，直接跳过。
+    """
+    missing = [path for path in paths if not os.path.exists(path)]
+    if not missing: return
+    from pyodide.http import open_url
+    for path in missing:
+        source = open_url(path).read()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(source)
+    importlib.invalidate_caches()
+
+class Lazy:
+    """
+    子系统的延迟代理：第一次访问属性时才拉取模块文件、导入并调用 factory 构造实例，
+    之后所有属性读写都转发给实例。用 is_loaded(proxy) 判断是否已构造 (不会触发加载)。
+    """
+
+    def __init__(self, name, factory, files=(), on_load=None):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_files", list(files))
+        object.__setattr__(self, "_on_load", on_load)
+        object.__setattr__(self, "_target", None)
+
+    def _resolve(self):
+        target = object.__getattribute__(self, "_target")
+        if target is None:
+            ensure_files(object.__getattribute__(self, "_files"))
+            target = object.__getattribute__(self, "_factory")()
+            object.__setattr__(self, "_target", target)
+            on_load = object.__getattribute__(self, "_on_load")
+            if on_load:
+                on_load(object.__getattribute__(self, "_name"))
+        return target
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._resolve(), attr, value)
+
+def is_loaded(proxy):
+    if isinstance(proxy, Lazy):
+        return object.__getattribute__(proxy, "_target") is not None
+    return True
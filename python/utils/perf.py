@@ -0,0 +1,50 @@
+class PerfCounters:
+    """运行时计数器 (存活的 JS 代理、重绘次数、存档写入字节 ...)，供状态栏提示与控制台读取"""
+
+    def __init__(self):
+        self.values = {}
+
+    def incr(self, name, amount=1):
+        self.values[name] = self.values.get(name, 0) + amount
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    def get(self, name, default=0):
+        return self.values.get(name, default)
+
+    def summary(self):
+        return " | ".join(f"{name}={value}" for name, value in sorted(self.values.items()))
+
+perf = PerfCounters()
+
+class StartupProfiler:
+    """
+    启动阶段计时：每次 mark 记录从页面导航开始到此刻的时间，以及与上一阶段的间隔 (毫秒)。
+    clock 返回毫秒 (浏览器中为 performance.now)，第一次 mark 前经过的时间计入第一个阶段。
+    """
+
+    def __init__(self, clock, budget_ms=None):
+        self.clock = clock
+        self.budget_ms = budget_ms
+        self.phases = [] # [(阶段名, 累计毫秒, 阶段耗时毫秒)]
+
+    def mark(self, phase):
+        now = self.clock()
+        last = self.phases[-1][1] if self.phases else 0
+        self.phases.append((phase, now, now - last))
+        perf.set(f"startup_{phase}_ms", round(now))
+        return now
+
+    def total(self):
+        return self.phases[-1][1] if self.phases else 0
+
+    def over_budget(self):
+        return self.budget_ms is not None and self.total() > self.budget_ms
+
+    def report(self):
+        lines = [f"{phase:<18}{at:9.1f} ms  (+{took:.1f})" for phase, at, took in self.phases]
+        if self.budget_ms is not None:
+            status = "OVER BUDGET" if self.over_budget() else "ok"
+            lines.append(f"{'budget':<18}{self.budget_ms:9.1f} ms  {status}")
+        return "\n".join(lines)
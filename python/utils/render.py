@@ -0,0 +1,333 @@
+from collections import deque
+
+_MISSING = object()
+
+class KeyedList:
+    """
+    保留模式的列表面板。
+    每个子节点按 key (资源 ID、守护程序索引、任务 ID、建筑 ID ...) 保留，
+    节点只在首次出现时创建；之后的更新只写入值发生变化的文本/样式属性，
+    消失的 key 对应的节点被移除。
+
+    factory(key) 返回 (root, bindings)：
+        root     - 子节点的根元素
+        bindings - { 槽位名: (元素, 属性) }，属性取值见 set_prop
+    update 传入 [(key, { 槽位名: 值 }), ...]，顺序即显示顺序。
+    """
+
+    def __init__(self, document, container, factory, empty_text=None):
+        self.document = document
+        self.container = container
+        self.factory = factory
+        self.empty_text = empty_text
+        self.nodes = {}   # { key: (root, bindings) }
+        self.values = {}  # { key: { 槽位名: 上次写入的值 } }
+        self.order = []
+        self.empty_node = None
+        self.empty_value = None
+        self.writes = 0   # 累计的 DOM 写入次数，便于观察重绘开销
+
+    def update(self, items):
+        keys = [key for key, _ in items]
+        seen = set(keys)
+
+        for key in list(self.nodes):
+            if key not in seen:
+                self.remove(key)
+
+        for key, props in items:
+            if key not in self.nodes:
+                root, bindings = self.factory(key)
+                self.nodes[key] = (root, bindings)
+                self.values[key] = {}
+                self.container.appendChild(root)
+            _, bindings = self.nodes[key]
+            last = self.values[key]
+            for slot, value in props.items():
+                if last.get(slot, _MISSING) == value: continue
+                node, prop = bindings[slot]
+                set_prop(node, prop, value)
+                last[slot] = value
+                self.writes += 1
+
+        # 只有顺序变化时才重新排列 (appendChild 会移动已有节点)
+        if keys != self.order:
+            for key in keys:
+                self.container.appendChild(self.nodes[key][0])
+            self.order = keys
+
+        self._update_empty(not items)
+
+    def remove(self, key):
+        root, _ = self.nodes.pop(key)
+        self.values.pop(key, None)
+        root.remove()
+
+    def clear(self):
+        for key in list(self.nodes):
+            self.remove(key)
+        self.order = []
+
+    def _update_empty(self, is_empty):
+        if self.empty_text is None: return
+        if is_empty and self.empty_node is None:
+            self.empty_node = self.document.createElement("div")
+            self.empty_node.className = "empty-msg"
+            self.container.appendChild(self.empty_node)
+            self.empty_value = None
+        if self.empty_node is not None:
+            if is_empty:
+                text = self.empty_text() if callable(self.empty_text) else self.empty_text
+                if self.empty_value != text:
+                    self.empty_node.innerText = text
+                    self.empty_value = text
+            else:
+                self.empty_node.remove()
+                self.empty_node = None
+
+def set_prop(node, prop, value):
+    """
+    写入一个槽位：
+    "text" -> innerText, "class" -> className, "title" -> title,
+    "disabled" -> disabled, "style.xxx" -> style.xxx, "attr.xxx" -> setAttribute
+    """
+    if prop == "text":
+        node.innerText = value
+    elif prop == "class":
+        node.className = value
+    elif prop == "title":
+        node.title = value
+    elif prop == "disabled":
+        node.disabled = value
+    elif prop.startswith("style."):
+        setattr(node.style, prop[6:], value)
+    elif prop.startswith("attr."):
+        node.setAttribute(prop[5:], value)
+    else:
+        setattr(node, prop, value)
+
+class TextPatcher:
+    """按 CSS 选择器缓存上次写入的值，值未变化时跳过 DOM 查询与写入"""
+
+    def __init__(self, document):
+        self.document = document
+        self.values = {}
+        self.writes = 0
+
+    def set(self, selector, value, prop="text"):
+        key = (selector, prop)
+        if self.values.get(key, _MISSING) == value: return
+        node = self.document.querySelector(selector)
+        if not node: return
+        set_prop(node, prop, value)
+        self.values[key] = value
+        self.writes += 1
+
+    def forget(self):
+        self.values = {}
+
+class ActionRouter:
+    """
+    委托点击处理。
+    每个面板容器只挂一个点击代理；子元素通过 data-action (以及 data-arg 等属性) 声明动作，
+    点击时沿 DOM 向上找到最近的 [data-action] 元素，再查 Python 路由表分发。
+    这样重绘不再为每个按钮创建新的 create_proxy，存活代理数量与会话时长无关。
+    """
+
+    def __init__(self, create_proxy, counters=None):
+        self.create_proxy = create_proxy
+        self.counters = counters
+        self.routes = {}    # { action: handler(element, event) }
+        self.bound = {}     # { 容器 ID: 代理 }
+        self.proxies = []
+
+    def route(self, action):
+        """装饰器：注册 data-action 对应的处理函数"""
+        def register(handler):
+            self.routes[action] = handler
+            return handler
+        return register
+
+    def make_proxy(self, fn):
+        """创建并登记一个长期存活的代理"""
+        proxy = self.create_proxy(fn)
+        self.proxies.append(proxy)
+        if self.counters is not None:
+            self.counters.set("proxies", len(self.proxies))
+        return proxy
+
+    def bind(self, container):
+        """为容器挂上委托点击处理 (同一容器只挂一次)"""
+        key = container.id
+        if key in self.bound: return
+        proxy = self.make_proxy(self.dispatch)
+        container.addEventListener("click", proxy)
+        self.bound[key] = proxy
+
+    def dispatch(self, event):
+        target = event.target.closest("[data-action]")
+        if not target: return
+        handler = self.routes.get(target.getAttribute("data-action"))
+        if handler:
+            handler(target, event)
+
+def set_action(element, action, arg=None):
+    """为元素声明委托点击动作"""
+    element.setAttribute("data-action", action)
+    if arg is not None:
+        element.setAttribute("data-arg", str(arg))
+
+class RenderScheduler:
+    """
+    合帧重绘调度。
+    request 只把界面标记为脏；同一帧内的多次请求合并为一次 requestAnimationFrame 回调。
+    页面隐藏 (document.hidden) 时浏览器会暂停 rAF，改用低频 setTimeout 刷新，
+    页面重新可见时立即补一帧。计数器记录请求次数与实际重绘次数。
+    """
+
+    def __init__(self, window, render, make_proxy, counters=None, hidden_interval_ms=5000):
+        self.window = window
+        self.render = render
+        self.counters = counters
+        self.hidden_interval_ms = hidden_interval_ms
+        self.pending = None # None / "frame" / "timer"
+        self.handle = None
+        self.frame_proxy = make_proxy(self.flush)
+        self.visibility_proxy = make_proxy(self.on_visibility_change)
+        window.document.addEventListener("visibilitychange", self.visibility_proxy)
+
+    def _count(self, name):
+        if self.counters is not None:
+            self.counters.incr(name)
+
+    def request(self):
+        self._count("redraw_requested")
+        if self.pending: return
+        if self.window.document.hidden:
+            self.pending = "timer"
+            self.handle = self.window.setTimeout(self.frame_proxy, self.hidden_interval_ms)
+        else:
+            self.pending = "frame"
+            self.handle = self.window.requestAnimationFrame(self.frame_proxy)
+
+    def flush(self, *args):
+        self.pending = None
+        self.handle = None
+        self.render()
+        self._count("redraw_performed")
+
+    def on_visibility_change(self, event=None):
+        # 隐藏期间挂起的低频刷新改为下一帧立即执行
+        if self.pending == "timer" and not self.window.document.hidden:
+            self.window.clearTimeout(self.handle)
+            self.pending = "frame"
+            self.handle = self.window.requestAnimationFrame(self.frame_proxy)
+
+class LogView:
+    """
+    日志的虚拟化视图：DOM 中最多保留 window_size 条记录。
+    停在底部时跟随新记录追加，并从顶部移除旧节点；
+    向上滚动接近顶部时在前面补上更早的一批、从底部移除同样数量，反之亦然，
+    并按锚点节点的位移修正 scrollTop，使可见内容不跳动。
+    get_log() 返回 engine.log.StoryLog / CombatLog (读档后可能是新对象)。
+    """
+
+    def __init__(self, document, container, get_log, make_proxy, window_size=60, edge_px=40,
+                 entry_class="log-entry", prefix="> "):
+        self.document = document
+        self.entry_class = entry_class
+        self.prefix = prefix
+        self.container = container
+        self.get_log = get_log
+        self.window_size = window_size
+        self.edge_px = edge_px
+        self.nodes = deque() # [(seq, 元素)]，按 seq 升序
+        self.source = None   # (log, epoch)
+        self.follow = True
+        container.addEventListener("scroll", make_proxy(self.on_scroll))
+
+    def _make_node(self, entry):
+        seq, kind, text = entry
+        node = self.document.createElement("div")
+        node.className = f"{self.entry_class} {self.entry_class}-{kind}"
+        node.innerText = f"{self.prefix}{text}"
+        return node
+
+    def _shown_range(self):
+        if not self.nodes:
+            return None, None
+        return self.nodes[0][0], self.nodes[-1][0]
+
+    def rebuild(self, end_seq):
+        """重建以 end_seq (不含) 结尾的窗口"""
+        log = self.get_log()
+        self.container.innerHTML = ""
+        self.nodes.clear()
+        for entry in log.slice(end_seq - self.window_size, end_seq):
+            node = self._make_node(entry)
+            self.container.appendChild(node)
+            self.nodes.append((entry[0], node))
+
+    def scroll_to_bottom(self):
+        self.container.scrollTop = self.container.scrollHeight
+
+    def sync(self):
+        """把日志中的新记录反映到视图；没有新记录时不触碰 DOM"""
+        log = self.get_log()
+        if self.source != (log, log.epoch):
+            self.source = (log, log.epoch)
+            self.rebuild(log.next_seq)
+            self.follow = True
+            self.scroll_to_bottom()
+            return
+
+        _, shown_last = self._shown_range()
+        if shown_last is None:
+            shown_last = log.first_seq - 1
+        if not self.follow or shown_last >= log.last_seq:
+            return
+
+        for entry in log.slice(shown_last + 1, log.next_seq):
+            node = self._make_node(entry)
+            self.container.appendChild(node)
+            self.nodes.append((entry[0], node))
+        while len(self.nodes) > self.window_size:
+            self.nodes.popleft()[1].remove()
+        self.scroll_to_bottom()
+
+    def on_scroll(self, event=None):
+        log = self.get_log()
+        el = self.container
+        shown_first, shown_last = self._shown_range()
+        if shown_first is None: return
+        step = self.window_size // 2
+
+        if el.scrollTop + el.clientHeight >= el.scrollHeight - self.edge_px:
+            if shown_last < log.last_seq:
+                # 向下补上更新的一批，移除顶部同样数量
+                anchor = self.nodes[-1][1]
+                before = anchor.offsetTop
+                for entry in log.slice(shown_last + 1, shown_last + 1 + step):
+                    node = self._make_node(entry)
+                    el.appendChild(node)
+                    self.nodes.append((entry[0], node))
+                while len(self.nodes) > self.window_size:
+                    self.nodes.popleft()[1].remove()
+                el.scrollTop += anchor.offsetTop - before
+                self.follow = self.nodes[-1][0] >= log.last_seq
+            else:
+                self.follow = True
+            return
+
+        self.follow = False
+        if el.scrollTop <= self.edge_px and shown_first > log.first_seq:
+            # 向上补上更早的一批，移除底部同样数量
+            anchor = self.nodes[0][1]
+            before = anchor.offsetTop
+            for entry in reversed(log.slice(shown_first - step, shown_first)):
+                node = self._make_node(entry)
+                el.insertBefore(node, el.firstChild)
+                self.nodes.appendleft((entry[0], node))
+            while len(self.nodes) > self.window_size:
+                self.nodes.pop()[1].remove()
+            el.scrollTop += anchor.offsetTop - before
@@ -1,37 +1,201 @@
+import hashlib
 import random
+from itertools import repeat
+
+BLOCK_SIZE = 4096 # 每个块由独立派生的种子生成，定位到任意位置最多快进一个块
+STREAMS = ("dungeon", "combat", "events", "npc", "capture")
+
+def derive_seed(key, label):
+    """由父种子与标签派生子种子 (与 Python 的 hash 随机化无关，跨进程稳定)"""
+    digest = hashlib.blake2b(f"{key}:{label}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
 
 class SeededRNG:
-    def __init__(self, seed=None):
+    """
+    可定位的确定性随机流。
+    所有抽取都经由 random() (或 randbytes，每 8 字节与一次 random() 消耗相同的状态)，
+    每次恰好消耗整数个位置，因此"已抽取次数" (position) 就是全部状态：
+    存档只需记录每条流的 position，读档后 seek 回去即可继续同一序列。
+    stream(name) 派生独立的命名子流 (dungeon / combat / events / npc / capture)，
+    各子系统的抽取互不影响，生成一层地牢不会改变下一个随机事件。
+    """
+
+    def __init__(self, seed=None, name=""):
         if seed is None:
             seed = random.randint(0, 1000000)
-        self.seed = seed
-        self.rng = random.Random(seed)
+        self.name = name
+        self.streams = {}
+        self.reseed(seed)
 
     def reseed(self, seed):
         self.seed = seed
-        self.rng = random.Random(seed)
+        self.key = derive_seed(seed, self.name) if self.name else seed
+        for name, child in self.streams.items():
+            child.reseed(seed)
+        self.seek(0)
 
     def get_seed(self):
         return self.seed
 
+    def seek(self, position):
+        block, offset = divmod(position, BLOCK_SIZE)
+        self.gen = random.Random(derive_seed(self.key, block))
+        self.block = block
+        self.left = BLOCK_SIZE - offset
+        for _ in repeat(None, offset):
+            self.gen.random()
+
+    @property
+    def position(self):
+        return (self.block + 1) * BLOCK_SIZE - self.left
+
+    def _next_block(self):
+        self.block += 1
+        self.gen = random.Random(derive_seed(self.key, self.block))
+        self.left = BLOCK_SIZE
+
+    def stream(self, name):
+        """返回 (并缓存) 以 name 命名的子流；同一种子下同名子流的序列总是相同"""
+        child = self.streams.get(name)
+        if child is None:
+            child = self.streams[name] = SeededRNG(self.seed, f"{self.name}/{name}" if self.name else name)
+        return child
+
+    def positions(self):
+        """{ 流名: 位置 }，主流的名字为 ""，用于存档"""
+        result = {self.name: self.position}
+        for child in self.streams.values():
+            result.update(child.positions())
+        return result
+
+    def restore(self, positions):
+        """按存档中的位置恢复主流与各子流 (需先 reseed 到存档的种子)"""
+        if self.name in positions:
+            self.seek(positions[self.name])
+        for name in positions:
+            if name and not self.name and "/" not in name:
+                self.stream(name)
+        for child in self.streams.values():
+            child.restore(positions)
+
     def random(self):
-        return self.rng.random()
+        if not self.left:
+            self._next_block()
+        self.left -= 1
+        return self.gen.random()
+
+    def random_batch(self, n):
+        """一次抽取 n 个 [0, 1) 浮点数，与连续调用 n 次 random() 的结果相同"""
+        result = []
+        while n > 0:
+            if not self.left:
+                self._next_block()
+            take = min(n, self.left)
+            draw = self.gen.random
+            result += [draw() for _ in repeat(None, take)]
+            self.left -= take
+            n -= take
+        return result
+
+    def randbytes(self, n):
+        """
+        一次抽取 n 个随机字节，每 8 字节占一个位置 (不足 8 字节按一个位置计)。
+        梅森旋转生成 8 字节与一次 random() 消耗的内部状态相同，因此 seek 仍然成立。
+        """
+        result = bytearray()
+        positions = (n + 7) // 8
+        while positions > 0:
+            if not self.left:
+                self._next_block()
+            take = min(positions, self.left)
+            result += self.gen.randbytes(8 * take)
+            self.left -= take
+            positions -= take
+        return bytes(result[:n])
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.random()
 
     def randint(self, a, b):
-        return self.rng.randint(a, b)
+        return a + int(self.random() * (b - a + 1))
 
     def choice(self, seq):
-        return self.rng.choice(seq)
+        return seq[int(self.random() * len(seq))]
+
+    def shuffle(self, seq):
+        """Fisher-Yates 洗牌 (原地)"""
+        for i in range(len(seq) - 1, 0, -1):
+            j = int(self.random() * (i + 1))
+            seq[i], seq[j] = seq[j], seq[i]
 
     def weighted_choice(self, choices):
         """
         choices: [ (item, weight), ... ]
         """
         total = sum(w for i, w in choices)
-        r = self.rng.uniform(0, total)
+        r = self.uniform(0, total)
         upto = 0
         for item, weight in choices:
             if upto + weight >= r:
                 return item
             upto += weight
         return choices[-1][0]
+
+    def sample(self, sampler):
+        """从预先构建的 WeightedSampler 中抽取一项 (O(1))"""
+        return sampler.sample(self)
+
+class WeightedSampler:
+    """
+    Vose 别名表：构建 O(n)，每次抽取 O(1)。
+    适合同一组权重被反复抽取的场合 (随机事件、捕获等)；权重变化后调用 rebuild。
+    sample(rng) 的 rng 只需提供 random()，SeededRNG 与 random 模块都可以。
+    """
+
+    def __init__(self, choices=()):
+        self.rebuild(choices)
+
+    def rebuild(self, choices):
+        """choices: [ (item, weight), ... ]，权重不大于 0 的项不会被抽中"""
+        pairs = [(item, weight) for item, weight in choices if weight > 0]
+        self.items = [item for item, _ in pairs]
+        n = len(pairs)
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        if not n: return
+
+        total = sum(weight for _, weight in pairs)
+        scaled = [weight * n / total for _, weight in pairs]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # 剩余项的概率因浮点误差可能略偏离 1，按 1 处理
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def __len__(self):
+        return len(self.items)
+
+    def sample(self, rng):
+        """一次 random() 同时决定列与硬币：整数部分选列，小数部分与该列概率比较"""
+        if not self.items:
+            return None
+        return self._pick(rng.random())
+
+    def sample_many(self, rng, n):
+        """批量抽取 n 项 (使用 rng.random_batch)"""
+        if not self.items:
+            return []
+        return [self._pick(u) for u in rng.random_batch(n)]
+
+    def _pick(self, r):
+        n = len(self.items)
+        u = r * n
+        i = int(u)
+        if i >= n: i = n - 1
+        return self.items[i] if u - i < self.prob[i] else self.items[self.alias[i]]
@@ -0,0 +1,298 @@
+"""
+紧凑存档格式 (导出/导入字符串用)。
+
+    CYBER2-<base64( 格式版本 1 字节 + zlib( 字符串表 + 值 ) )>
+
+值按类型标记编码，所有字符串 (包括字典键) 进入字符串表，正文中只写序号；
+列表按"列"编码：整数列、浮点列、字符串列直接写成定长数组 (array 一次性打包/解包)；
+键集合相同的字典列表 (守护程序、属性等) 只写一次键，再逐键写出各列；
+等长的列表的列表 (剧情日志条目) 按位置拆成列，不等长的 (已学技能) 展平成一列再记录各自长度。
+旧的 CYBER-<base64(JSON)> 格式仍可读取。
+"""
+import base64
+import gc
+import json
+import struct
+import sys
+import zlib
+from array import array
+
+SAVE_PREFIX = "CYBER2-"
+LEGACY_PREFIX = "CYBER-"
+FORMAT_VERSION = 1
+
+# 值标记
+T_NONE, T_FALSE, T_TRUE, T_INT, T_FLOAT, T_STR, T_LIST, T_DICT = range(8)
+# 列类型
+C_EMPTY, C_INT32, C_INT64, C_FLOAT, C_NUMBER, C_STR, C_RECORDS, C_ROWS, C_LISTS, C_ANY = range(10)
+
+INT32_RANGE = (-2 ** 31, 2 ** 31 - 1)
+INT64_RANGE = (-2 ** 63, 2 ** 63 - 1)
+EXACT_INT = 2 ** 53 # 在此范围内的整数可以无损存为 double
+_FLOAT = struct.Struct("<d")
+_SWAP = sys.byteorder != "little" # 数组一律按小端存储
+
+def _pack(typecode, values):
+    arr = array(typecode, values)
+    if _SWAP: arr.byteswap()
+    return arr.tobytes()
+
+class _Writer:
+    def __init__(self):
+        self.out = bytearray()
+        self.strings = {} # { 字符串: 序号 }
+
+    def varint(self, n):
+        out = self.out
+        while n > 0x7F:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+
+    def string(self, s):
+        index = self.strings.get(s)
+        if index is None:
+            index = self.strings[s] = len(self.strings)
+        return index
+
+    def value(self, v):
+        if v is None:
+            self.out.append(T_NONE)
+        elif v is True or v is False:
+            self.out.append(T_TRUE if v else T_FALSE)
+        elif isinstance(v, int):
+            self.out.append(T_INT)
+            self.varint(v * 2 if v >= 0 else -v * 2 - 1) # zigzag
+        elif isinstance(v, float):
+            self.out.append(T_FLOAT)
+            self.out += _FLOAT.pack(v)
+        elif isinstance(v, str):
+            self.out.append(T_STR)
+            self.varint(self.string(v))
+        elif isinstance(v, (list, tuple)):
+            self.out.append(T_LIST)
+            self.column(v)
+        elif isinstance(v, dict):
+            self.out.append(T_DICT)
+            self.varint(len(v))
+            for key, item in v.items():
+                if not isinstance(key, str):
+                    raise TypeError(f"存档字典的键必须是字符串: {key!r}")
+                self.varint(self.string(key))
+                self.value(item)
+        else:
+            raise TypeError(f"无法编码的存档值: {type(v).__name__}")
+
+    def column(self, values):
+        """写出一个列表：长度 + 列类型 + 数据"""
+        self.varint(len(values))
+        if not values:
+            self.out.append(C_EMPTY)
+            return
+        kinds = {type(v) for v in values}
+        if kinds == {int}:
+            lo, hi = min(values), max(values)
+            if INT32_RANGE[0] <= lo and hi <= INT32_RANGE[1]:
+                self.out.append(C_INT32)
+                self.out += _pack("i", values)
+                return
+            if INT64_RANGE[0] <= lo and hi <= INT64_RANGE[1]:
+                self.out.append(C_INT64)
+                self.out += _pack("q", values)
+                return
+        elif kinds == {float}:
+            self.out.append(C_FLOAT)
+            self.out += _pack("d", values)
+            return
+        elif kinds == {int, float}:
+            # 整数与小数混合 (例如按 0.5 成长的属性)：存为 double 列 + 每项是否为整数的标记
+            if all(-EXACT_INT <= v <= EXACT_INT for v in values if type(v) is int):
+                self.out.append(C_NUMBER)
+                self.out += _pack("d", values)
+                self.out += bytes(type(v) is int for v in values)
+                return
+        elif kinds == {str}:
+            self.out.append(C_STR)
+            self.out += _pack("I", [self.string(s) for s in values])
+            return
+        elif all(issubclass(kind, dict) for kind in kinds):
+            keys = tuple(values[0])
+            if all(isinstance(key, str) for key in keys) and all(tuple(v) == keys for v in values):
+                self.out.append(C_RECORDS)
+                self.varint(len(keys))
+                for key in keys:
+                    self.varint(self.string(key))
+                for key in keys:
+                    self.column([v[key] for v in values])
+                return
+        elif all(issubclass(kind, (list, tuple)) for kind in kinds):
+            width = len(values[0])
+            if width and all(len(v) == width for v in values):
+                self.out.append(C_ROWS)
+                self.varint(width)
+                for i in range(width):
+                    self.column([v[i] for v in values])
+                return
+            self.out.append(C_LISTS)
+            self.out += _pack("I", [len(v) for v in values])
+            self.column([item for v in values for item in v])
+            return
+        self.out.append(C_ANY)
+        for v in values:
+            self.value(v)
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self.strings = []
+
+    def byte(self):
+        b = self.data[self.pos]
+        self.pos += 1
+        return b
+
+    def varint(self):
+        data = self.data
+        shift = n = 0
+        while True:
+            b = data[self.pos]
+            self.pos += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    def array(self, typecode, count):
+        arr = array(typecode)
+        end = self.pos + count * arr.itemsize
+        if end > len(self.data):
+            raise ValueError("存档数据被截断")
+        arr.frombytes(self.data[self.pos:end])
+        if _SWAP: arr.byteswap()
+        self.pos = end
+        return arr
+
+    def value(self):
+        tag = self.byte()
+        if tag == T_NONE: return None
+        if tag == T_FALSE: return False
+        if tag == T_TRUE: return True
+        if tag == T_INT:
+            n = self.varint()
+            return n >> 1 if not n & 1 else -(n >> 1) - 1
+        if tag == T_FLOAT:
+            v = _FLOAT.unpack_from(self.data, self.pos)[0]
+            self.pos += 8
+            return v
+        if tag == T_STR: return self.strings[self.varint()]
+        if tag == T_LIST: return self.column()
+        if tag == T_DICT:
+            strings = self.strings
+            result = {}
+            for _ in range(self.varint()):
+                key = strings[self.varint()]
+                result[key] = self.value()
+            return result
+        raise ValueError(f"未知的值标记 {tag}")
+
+    def column(self):
+        count = self.varint()
+        kind = self.byte()
+        if kind == C_EMPTY: return []
+        if kind == C_INT32: return self.array("i", count).tolist()
+        if kind == C_INT64: return self.array("q", count).tolist()
+        if kind == C_FLOAT: return self.array("d", count).tolist()
+        if kind == C_NUMBER:
+            values = self.array("d", count)
+            flags = self.data[self.pos:self.pos + count]
+            self.pos += count
+            return [int(v) if is_int else v for v, is_int in zip(values, flags)]
+        if kind == C_STR:
+            strings = self.strings
+            return [strings[i] for i in self.array("I", count)]
+        if kind == C_RECORDS:
+            keys = [self.strings[self.varint()] for _ in range(self.varint())]
+            columns = [self.column() for _ in keys]
+            return [dict(zip(keys, row)) for row in zip(*columns)] if keys else [{} for _ in range(count)]
+        if kind == C_ROWS:
+            columns = [self.column() for _ in range(self.varint())]
+            return [list(row) for row in zip(*columns)]
+        if kind == C_LISTS:
+            lengths = self.array("I", count)
+            flat = self.column()
+            result = []
+            pos = 0
+            for length in lengths:
+                result.append(flat[pos:pos + length])
+                pos += length
+            return result
+        if kind == C_ANY: return [self.value() for _ in range(count)]
+        raise ValueError(f"未知的列类型 {kind}")
+
+def encode_save(data):
+    """存档字典 -> 压缩后的二进制 (首字节为格式版本)"""
+    writer = _Writer()
+    writer.value(data)
+    body = writer.out
+
+    # 字符串表：各字符串的字符数 + 拼接后的 UTF-8 文本，解码时只需一次 decode
+    strings = list(writer.strings)
+    header = _Writer()
+    header.varint(len(strings))
+    header.out += _pack("I", [len(s) for s in strings])
+    text = "".join(strings).encode("utf-8")
+    header.varint(len(text))
+    header.out += text
+    return bytes([FORMAT_VERSION]) + zlib.compress(bytes(header.out + body), 6)
+
+def decode_save(raw):
+    """压缩后的二进制 -> 存档字典；格式版本不支持或数据损坏时抛出 ValueError"""
+    if not raw:
+        raise ValueError("存档为空")
+    if raw[0] != FORMAT_VERSION:
+        raise ValueError(f"不支持的存档版本 {raw[0]}")
+    try:
+        payload = zlib.decompress(raw[1:])
+    except zlib.error as e:
+        raise ValueError(f"存档数据损坏: {e}")
+
+    # 解码会一次性创建大量小容器，期间暂停循环垃圾回收 (大存档下约占一半耗时)
+    reader = _Reader(payload)
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        lengths = reader.array("I", reader.varint())
+        size = reader.varint()
+        text = payload[reader.pos:reader.pos + size].decode("utf-8")
+        reader.pos += size
+        pos = 0
+        for length in lengths:
+            reader.strings.append(text[pos:pos + length])
+            pos += length
+        return reader.value()
+    except (IndexError, struct.error) as e:
+        raise ValueError(f"存档数据被截断: {e}")
+    finally:
+        if gc_was_enabled: gc.enable()
+
+def dumps_save_string(data):
+    """存档字典 -> 可复制粘贴的 CYBER2- 字符串"""
+    return SAVE_PREFIX + base64.b64encode(encode_save(data)).decode("ascii")
+
+def loads_save_string(save_str):
+    """
+    CYBER2- 或旧的 CYBER- 字符串 -> 存档字典。
+    前缀不识别时抛出 ValueError。
+    """
+    save_str = save_str.strip()
+    if save_str.startswith(SAVE_PREFIX):
+        try:
+            raw = base64.b64decode(save_str[len(SAVE_PREFIX):], validate=True)
+        except ValueError as e:
+            raise ValueError(f"存档编码错误: {e}")
+        return decode_save(raw)
+    if save_str.startswith(LEGACY_PREFIX):
+        json_bytes = base64.b64decode(save_str[len(LEGACY_PREFIX):])
+        return json.loads(json_bytes.decode("utf-8"))
+    raise ValueError("无效的存档格式")
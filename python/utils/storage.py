@@ -1,44 +1,197 @@
-import base64
+import asyncio
 import json
-from js import window, localStorage
+import time
+from collections import deque
+from utils.savecodec import SAVE_PREFIX, LEGACY_PREFIX, encode_save, decode_save, dumps_save_string, loads_save_string
 
 SAVE_KEY = "CYBER_IDLE_SAVE"
 
-def save_to_local(state):
-    """保存游戏状态到 localStorage"""
-    json_str = state.to_json()
-    localStorage.setItem(SAVE_KEY, json_str)
+# 分段存档：体积大、变化少的字段单独存放，只有变化的段才重新序列化
+SECTION_FIELDS = {
+    "daemons": ["daemons", "active_daemon_index"],
+    "artifacts": ["artifacts"],
+    "story_log": ["story_log"],
+}
+CORE_SECTION = "core" # 其余全部字段
 
-def load_from_local(state):
-    """从 localStorage 加载游戏状态"""
-    save_data = localStorage.getItem(SAVE_KEY)
-    if save_data:
+def section_key(section):
+    return f"{SAVE_KEY}:{section}"
+
+def split_sections(data):
+    """把 GameState.to_dict() 的结果拆分为 { 段名: 字典 }"""
+    sections = {CORE_SECTION: dict(data)}
+    for section, fields in SECTION_FIELDS.items():
+        sections[section] = {field: sections[CORE_SECTION].pop(field) for field in fields if field in data}
+    return sections
+
+def encode_section(backend, data):
+    """能存二进制的后端使用紧凑格式 (utils/savecodec.py)，否则存 JSON 字符串"""
+    return encode_save(data) if backend.binary else json.dumps(data)
+
+def decode_section(value):
+    return json.loads(value) if isinstance(value, str) else decode_save(value)
+
+def section_versions(state):
+    """各段的版本号：版本未变的段无需序列化"""
+    versions = state.field_versions
+    return {
+        CORE_SECTION: max(versions.get(field, 0) for field in ("resources", "buildings", "active_quests", "current_story_node")),
+        "daemons": max(versions.get(field, 0) for field in SECTION_FIELDS["daemons"]),
+        "artifacts": versions.get("artifacts", 0),
+        "story_log": (id(state.story_log), state.story_log.epoch, state.story_log.next_seq),
+    }
+
+class AutoSaver:
+    """
+    增量自动存档。
+    每次 tick 比较各段版本号：有变化时等状态稳定 debounce 秒后再写 (连续变化最多推迟 max_delay 秒)，
+    只序列化并写入版本变化的段；序列化结果与上次写入相同时也跳过。
+    状态完全静止时只按 heartbeat 间隔写一次 core 段 (记录 last_update 供离线结算)。
+    序列化 (to_dict + 编码) 在 tick 中同步进行，会占用那一次游戏循环，但只涉及变化的段且经过防抖；
+    只有存储提交交给后端排队，在独立的协程中批量完成 (见 utils/backends.py)。
+    """
+
+    def __init__(self, state, backend, counters=None, debounce=2.0, max_delay=10.0, heartbeat=60.0, clock=time.time):
+        self.state = state
+        self.backend = backend
+        self.counters = counters
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.heartbeat = heartbeat
+        self.clock = clock
+        self.saved_versions = {} # { 段名: 上次写入时的版本 }
+        self.saved_text = {}     # { 段名: 上次写入的字符串 }
+        self.seen_versions = None
+        self.first_dirty = None
+        self.last_change = None
+        self.last_core = clock()
+        self.written = deque()   # [(时间, 字节数)]，用于统计最近一分钟的写入量
+        self.flush_task = None
+
+    def _dirty_sections(self, versions):
+        return [section for section, version in versions.items() if self.saved_versions.get(section) != version]
+
+    def tick(self):
+        """由游戏循环定期调用；决定是否需要写盘"""
+        now = self.clock()
+        versions = section_versions(self.state)
+        if versions != self.seen_versions:
+            self.seen_versions = versions
+            self.last_change = now
+            if self.first_dirty is None and self._dirty_sections(versions):
+                self.first_dirty = now
+
+        if self.first_dirty is not None:
+            if now - self.last_change >= self.debounce or now - self.first_dirty >= self.max_delay:
+                self.save()
+        elif now - self.last_core >= self.heartbeat:
+            self.save(sections=[CORE_SECTION])
+
+    def save(self, sections=None, force=False):
+        """写入变化的段 (force 时写入全部段)，返回写入的字节数"""
+        now = self.clock()
+        versions = section_versions(self.state)
+        if force:
+            sections = list(versions)
+        elif sections is None:
+            sections = self._dirty_sections(versions)
+        # core 段包含 tick_count / last_update 等每次都会变化的字段，凡是写盘都一并写入
+        if CORE_SECTION not in sections:
+            sections = [CORE_SECTION] + list(sections)
+
+        data = split_sections(self.state.to_dict())
+        written = 0
+        for section in sections:
+            value = encode_section(self.backend, data[section])
+            if not force and self.saved_text.get(section) == value:
+                self.saved_versions[section] = versions[section]
+                continue
+            self.backend.set(section_key(section), value)
+            self.saved_text[section] = value
+            self.saved_versions[section] = versions[section]
+            written += len(value.encode("utf-8")) if isinstance(value, str) else len(value)
+
+        self.first_dirty = None
+        self.last_core = now
+        self._count(now, written)
+        if written:
+            self._schedule_flush()
+        return written
+
+    def _schedule_flush(self):
+        if self.flush_task is not None and not self.flush_task.done():
+            return # 正在提交的 flush 会顺带提交新的写入
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return # 没有事件循环 (同步的无头运行)：由调用方 await backend.flush()
+        self.flush_task = loop.create_task(self.flush())
+
+    async def flush(self):
+        """提交后端队列中的写入并记录提交耗时；失败的写入留在队列中，下次存档时重试"""
+        start = time.perf_counter()
         try:
+            await self.backend.flush()
+        except Exception as e:
+            print(f"存档写入失败 ({self.backend.name}): {e}")
+            if self.counters is not None:
+                self.counters.incr("save_errors")
+            return
+        if self.counters is not None:
+            self.counters.set("save_flush_ms", round((time.perf_counter() - start) * 1000, 1))
+
+    def _count(self, now, written):
+        if written:
+            self.written.append((now, written))
+        while self.written and now - self.written[0][0] > 60:
+            self.written.popleft()
+        if self.counters is not None:
+            self.counters.incr("save_bytes", written)
+            self.counters.set("save_bytes_per_min", sum(n for _, n in self.written))
+
+    def mark_loaded(self):
+        """读档后调用：当前状态与存储一致，不必立即回写"""
+        self.saved_versions = section_versions(self.state)
+        self.seen_versions = dict(self.saved_versions)
+        self.first_dirty = None
+
+def load_saved(state, backend):
+    """从存储后端加载游戏状态 (优先读取分段存档，兼容旧的整体存档)；后端中没有存档时返回 False"""
+    try:
+        core = backend.get(section_key(CORE_SECTION))
+        if core:
+            data = decode_section(core)
+            for section in SECTION_FIELDS:
+                value = backend.get(section_key(section))
+                if value:
+                    data.update(decode_section(value))
+            state.from_dict(data)
+            return True
+        save_data = backend.get(SAVE_KEY)
+        if save_data:
             state.from_json(save_data)
             return True
-        except Exception as e:
-            print(f"加载存档失败，正在清除损坏的存档: {e}")
-            localStorage.removeItem(SAVE_KEY)
+    except Exception as e:
+        print(f"加载存档失败，正在清除损坏的存档: {e}")
+        backend.remove(SAVE_KEY)
+        for section in [CORE_SECTION] + list(SECTION_FIELDS):
+            backend.remove(section_key(section))
     return False
 
 def export_save_string(state):
-    """导出 Base64 加密的存档字符串"""
-    json_str = state.to_json()
-    # 使用 Python 标准库 base64
-    data_bytes = json_str.encode('utf-8')
-    b64_str = base64.b64encode(data_bytes).decode('utf-8')
-    return f"CYBER-{b64_str}"
+    """导出紧凑存档字符串 (CYBER2- 格式，见 utils/savecodec.py)"""
+    return dumps_save_string(state.to_dict())
 
 def import_save_string(state, save_str):
-    """从 Base64 字符串导入存档"""
-    if not save_str.startswith("CYBER-"):
+    """从存档字符串导入 (兼容旧的 CYBER- Base64 格式)"""
+    if not save_str.strip().startswith((SAVE_PREFIX, LEGACY_PREFIX)):
         return False, "无效的存档格式"
-    
+
     try:
-        b64_part = save_str[6:]
-        json_bytes = base64.b64decode(b64_part)
-        json_str = json_bytes.decode('utf-8')
-        state.from_json(json_str)
+        data = loads_save_string(save_str)
+        if not isinstance(data, dict):
+            return False, "无效的存档格式"
+        state.from_dict(data)
         return True, "存档加载成功"
     except Exception as e:
         return False, f"解析存档失败: {e}"